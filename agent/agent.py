@@ -1,25 +1,246 @@
-import ast
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from langgraph.graph import StateGraph, END, START
 from langchain_openai import ChatOpenAI
-from typing import TypedDict, List, Dict, Union
+from langchain_core.messages import AIMessage
+from typing import TypedDict, Dict, Union
 import requests
 import pprint 
 
 # Tools #
 from agent.agent_tools import search_tool, download_relevant_content
+from agent.llm_cache import LLMCache
+from agent.entity_cache import EntityCache
+from agent.entity_index import EntityIndex, merge_by_canonical
+from agent.context_packer import ContextPacker, Tokenizer, chunk_document, tokenize_url
+from agent.page_fetcher import PageFetcher
+from agent.output_parsing import (
+    NER_SCHEMA, SUMMARIES_SCHEMA, OutputParsingError, json_schema_format, parse_entities, parse_summaries
+)
 
 # Definimos el modelo y el estado
+LLM_BASE_URL = "http://127.0.0.1:1234/v1"
 llm = ChatOpenAI(
-    openai_api_base="http://127.0.0.1:1234/v1",
+    openai_api_base=LLM_BASE_URL,
     openai_api_key="not-needed",
     model="qwen/qwen3-4b-2507"
 )
 
+# Límites de concurrencia independientes para SearXNG y para el servidor del LLM.
+# Son globales al proceso, así que se respetan aunque se procesen varios videos a la vez
+SEARCH_CONCURRENCY = 4
+LLM_CONCURRENCY = 4
+search_semaphore = threading.BoundedSemaphore(SEARCH_CONCURRENCY)
+llm_semaphore = threading.BoundedSemaphore(LLM_CONCURRENCY)
+
+def configure_concurrency(search: int = None, llm_calls: int = None):
+    """Cambia los límites de peticiones simultáneas a SearXNG y al LLM"""
+    global search_semaphore, llm_semaphore
+    if search is not None:
+        search_semaphore = threading.BoundedSemaphore(search)
+    if llm_calls is not None:
+        llm_semaphore = threading.BoundedSemaphore(llm_calls)
+
+class TokenCounter:
+    """Tokens consumidos por las llamadas al LLM (según usage_metadata del servidor)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.calls = 0
+
+    def add(self, response):
+        usage = getattr(response, "usage_metadata", None) or {}
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {"calls": self.calls, "input_tokens": self.input_tokens, "output_tokens": self.output_tokens}
+
+token_usage = TokenCounter()
+
+# Caché de respuestas del LLM compartida por los nodos (path None para desactivarla).
+# Se abre en la primera llamada al LLM, no al importar el módulo
+LLM_CACHE_PATH = "./cache/llm_responses.db"
+LLM_CACHE_MB = 128
+llm_cache = None
+_llm_cache_config = (LLM_CACHE_PATH, LLM_CACHE_MB)
+_llm_cache_lock = threading.Lock()
+
+def configure_llm_cache(path: str = LLM_CACHE_PATH, max_mb: int = LLM_CACHE_MB):
+    """Cambia la ubicación/tamaño de la caché del LLM. Con path=None se desactiva"""
+    global llm_cache, _llm_cache_config
+    with _llm_cache_lock:
+        _llm_cache_config = (path, max_mb)
+        llm_cache = None
+
+def get_llm_cache():
+    """Caché del LLM, creándola si es la primera vez. None si está desactivada"""
+    global llm_cache
+    with _llm_cache_lock:
+        path, max_mb = _llm_cache_config
+        if llm_cache is None and path:
+            llm_cache = LLMCache(path, max_mb)
+        return llm_cache
+
+# Conocimiento web por entidad compartido entre videos (path None para desactivarlo).
+# Como la del LLM, se abre la primera vez que se usa
+ENTITY_CACHE_PATH = "./cache/entities.db"
+ENTITY_CACHE_TTL_DAYS = 30
+entity_cache = None
+_entity_cache_config = (ENTITY_CACHE_PATH, ENTITY_CACHE_TTL_DAYS)
+_entity_cache_lock = threading.Lock()
+
+def configure_entity_cache(path: str = ENTITY_CACHE_PATH, ttl_days: float = ENTITY_CACHE_TTL_DAYS):
+    """Cambia la ubicación/TTL de la caché de entidades. Con path=None se desactiva"""
+    global entity_cache, _entity_cache_config
+    with _entity_cache_lock:
+        _entity_cache_config = (path, ttl_days)
+        entity_cache = None
+
+def get_entity_cache():
+    """Caché de entidades, creándola si es la primera vez. None si está desactivada"""
+    global entity_cache
+    with _entity_cache_lock:
+        path, ttl_days = _entity_cache_config
+        if entity_cache is None and path:
+            entity_cache = EntityCache(path, ttl_days=ttl_days)
+        return entity_cache
+
+# Índice de entidades del corpus: variantes del mismo sitio se unifican tras la NER
+entity_index = EntityIndex()
+
+# Presupuesto de tokens de los documentos web que recibe web_summary_node.
+# El procesado del prompt es lo que más tarda en el servidor local
+WEB_CONTEXT_TOKENS = 1500
+# Tokenizador del modelo: /tokenize de llama.cpp en el mismo servidor que el LLM.
+# Otros servidores (LM Studio) no lo tienen y se estima por caracteres
+TOKENIZER_URL = tokenize_url(LLM_BASE_URL)
+context_packer = ContextPacker(WEB_CONTEXT_TOKENS, Tokenizer(TOKENIZER_URL))
+
+def configure_context_budget(tokens: int = WEB_CONTEXT_TOKENS, tokenizer_url: str = TOKENIZER_URL):
+    """Cambia el presupuesto de tokens del contexto web y el tokenizador (tokenizer_url None: estimación)"""
+    global context_packer
+    context_packer = ContextPacker(tokens, Tokenizer(tokenizer_url))
+
+# Enriquecimiento opcional: además de los snippets de SearXNG, se descargan las
+# páginas de los primeros resultados y se extrae su contenido relevante
+FULL_PAGES = False
+FULL_PAGE_URLS = 3
+# Las páginas se trocean en fragmentos de este tamaño para que compitan con los snippets por el presupuesto
+FULL_PAGE_CHUNK_CHARS = 600
+page_fetcher = None
+
+def configure_full_pages(enabled: bool = FULL_PAGES, max_urls: int = FULL_PAGE_URLS):
+    """Activa/desactiva la descarga de páginas completas en web_download_node"""
+    global FULL_PAGES, FULL_PAGE_URLS, page_fetcher
+    FULL_PAGES, FULL_PAGE_URLS = enabled, max_urls
+    if enabled and page_fetcher is None:
+        page_fetcher = PageFetcher()
+    elif not enabled:
+        close_page_fetcher()
+
+def close_page_fetcher():
+    global page_fetcher
+    if page_fetcher is not None:
+        page_fetcher.close()
+        page_fetcher = None
+
+# Generación restringida a un esquema JSON (response_format) en los nodos con salida estructurada.
+# Si el servidor no lo admite se desactiva sola tras el primer error
+STRUCTURED_OUTPUT = True
+# Reintentos del nodo cuando la salida no se puede parsear
+PARSE_RETRIES = 2
+
+def invoke_llm(messages, template: str = "", response_format=None, use_cache: bool = True, store: bool = True):
+    """
+    Llama al LLM respetando el límite de concurrencia. Con use_cache consulta antes
+    la caché y con store guarda en ella la respuesta
+    """
+    store_cache = get_llm_cache()
+    cache = store_cache if use_cache else None
+    key = LLMCache.key(llm.model_name, template, messages) if store_cache is not None else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return AIMessage(content=cached)
+
+    with llm_semaphore:
+        if response_format is not None:
+            response = llm.invoke(messages, response_format=response_format)
+        else:
+            response = llm.invoke(messages)
+    token_usage.add(response)
+    if store and store_cache is not None:
+        store_cache.set(key, response.content)
+    return response
+
+def rejects_response_format(error: Exception) -> bool:
+    """
+    Si el error es el servidor rechazando la petición (400/422, por ejemplo por no
+    admitir response_format). Timeouts, conexiones cortadas y 5xx no lo son
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status in (400, 422) or type(error).__name__ in ("BadRequestError", "UnprocessableEntityError")
+
+def invoke_llm_structured(messages, template: str, schema_name: str, schema, parse):
+    """
+    Llama al LLM pidiendo una salida con el esquema dado y la parsea con `parse`.
+    Si la salida no es válida, reintenta solo esta llamada (sin caché). Solo se
+    guardan en caché las respuestas que se pueden parsear.
+    """
+    global STRUCTURED_OUTPUT
+    last_error = None
+    for attempt in range(PARSE_RETRIES + 1):
+        response_format = json_schema_format(schema_name, schema) if STRUCTURED_OUTPUT else None
+        try:
+            response = invoke_llm(messages, template, response_format=response_format,
+                                  use_cache=attempt == 0, store=False)
+        except Exception as e:
+            # Los errores transitorios se propagan; solo se renuncia al esquema si el servidor lo rechaza
+            if response_format is None or not rejects_response_format(e):
+                raise
+            print(f"El servidor no acepta response_format ({e}); se usará el parser tolerante")
+            STRUCTURED_OUTPUT = False
+            response = invoke_llm(messages, template, use_cache=attempt == 0, store=False)
+
+        try:
+            parsed = parse(response.content)
+        except OutputParsingError as e:
+            last_error = e
+            print(f"Salida no válida (intento {attempt + 1}/{PARSE_RETRIES + 1}): {e}")
+            continue
+
+        cache = get_llm_cache()
+        if cache is not None:
+            cache.set(LLMCache.key(llm.model_name, template, messages), response.content)
+        return parsed
+    raise last_error
+
+def run_search(query):
+    # El hueco del semáforo solo lo ocupa la petición real; las consultas repetidas esperan sin él
+    return search_tool(query, limiter=search_semaphore)
+
+def fan_out(func, items, max_workers: int = 16):
+    """Aplica func a cada elemento en paralelo y devuelve los resultados en el mismo orden"""
+    items = list(items)
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
 # Definimos el estado
 class State(TypedDict):
     text: str
-    entities: List[str]  # Simplificamos a una lista de strings para este ejemplo
-    summaries: Dict[str, str]
+    entities: Dict[str, str]  # Nombre canónico de la entidad -> descripción del NER
+    summaries: str  # JSON {"Summaries": {entidad: resumen}}
     entities_web_content: Dict[str, str]
     entities_web_summaries: Dict[str, str]
 
@@ -41,10 +262,12 @@ def ner_node(state: State):
         {"role": "system", "content": ner_prompt},
         {"role": "user", "content": input_text}
     ]
-    response = llm.invoke(messages)
-    # Por simplicidad, asumimos que el LLM devuelve una lista de entidades en formato string
-    # En un caso real, necesitarías un parser para obtener una lista de Python
-    parsed_dict = ast.literal_eval(response.content)
+    # Diccionario entidad -> descripción, con generación restringida al esquema y parser tolerante.
+    # Si tras los reintentos no se puede parsear, el error llega al driver y el video queda pendiente
+    parsed_dict = invoke_llm_structured(messages, ner_prompt, "entities", NER_SCHEMA, parse_entities)
+    # Unificamos variantes ("La Sagrada Família, Barcelona, Spain" -> "Sagrada Familia, Barcelona")
+    # para no buscar ni resumir dos veces la misma entidad
+    parsed_dict = merge_by_canonical(parsed_dict, entity_index)
     return {"entities": parsed_dict}
 
 # Nodo 2: Resumen de entidades
@@ -60,37 +283,80 @@ def summary_node(state: State):
         {"role": "system", "content": video_summarize_prompt.format(input_text=input_text, entities=formatted_entities)}
     ]
     
-    response = llm.invoke(messages)
-    return {"summaries": response.content}
+    summaries = invoke_llm_structured(
+        messages, video_summarize_prompt, "summaries", SUMMARIES_SCHEMA, parse_summaries
+    )
+    # Se guarda como JSON {"Summaries": {...}}, el mismo formato que lee data-cleaning
+    return {"summaries": json.dumps({"Summaries": summaries}, ensure_ascii=False)}
 
 # Nodo 3: Búsqueda y descarga de contenido relevante
 def web_download_node(state: State, query_suffix: str = " review"):
-    web_dict = {}
-    for entity in state["entities"]:
+    cache = get_entity_cache()
+    fetcher = page_fetcher if FULL_PAGES else None
+    # El contenido con páginas completas se cachea aparte del de solo snippets
+    cache_suffix = f"{query_suffix}:full{FULL_PAGE_URLS}:chunk{FULL_PAGE_CHUNK_CHARS}" if fetcher is not None \
+        else query_suffix
+
+    def download(entity):
+        if cache is not None:
+            cached = cache.get_web_content(entity, cache_suffix)
+            if cached is not None:
+                return cached
         print(f"Buscando información sobre: {entity}")
-        search_results = search_tool(entity + query_suffix)
+        # Si la búsqueda falla tras los reintentos el error se propaga y el video queda
+        # pendiente, en lugar de darlo por terminado sin contenido web
+        search_results = run_search(entity + query_suffix)
+        documents = [
+            f'title: {result["title"]}\ncontent: {result["content"]}\n' for result in search_results.get('results', [])
+        ]
+        if fetcher is not None:
+            urls = [result["url"] for result in search_results.get('results', []) if result.get("url")]
+            query = entity.split(",")[0] + query_suffix
+            for page in download_relevant_content(query, urls, max_urls=FULL_PAGE_URLS, fetcher=fetcher):
+                for chunk in chunk_document(page["content"], FULL_PAGE_CHUNK_CHARS):
+                    documents.append(f'title: {page["url"]}\ncontent: {chunk}\n')
         # Formateamos el contenido de los resultados
-        results_txt = 'NEW DOCUMENT:\n'.join(
-        f'title: {result["title"]}\ncontent: {result["content"]}\n' for result in search_results.get('results', [])
-        )
-        web_dict[entity] = results_txt
+        results_txt = 'NEW DOCUMENT:\n'.join(documents)
+        if cache is not None:
+            cache.set_web_content(entity, cache_suffix, results_txt)
+        return results_txt
+
+    # Una búsqueda por entidad, en paralelo (limitadas por search_semaphore)
+    entities = list(state["entities"])
+    web_dict = dict(zip(entities, fan_out(download, entities)))
 
     return {"entities_web_content": web_dict}
 
 # Nodo 4: En base a los artículos descargados, generar un resumen adicional
 def web_summary_node(state: State):
-    web_summary_dict = {}
-    for entity, content in state["entities_web_content"].items():
+    cache = get_entity_cache()
+
+    def summarize(item):
+        entity, content = item
         if not content.strip():
-            web_summary_dict[entity] = "No se encontró contenido relevante."
-            continue
+            return "No se encontró contenido relevante."
+        if cache is not None:
+            cached = cache.get_web_summary(entity, llm.model_name, web_summarize_prompt)
+            if cached is not None:
+                return cached
         
+        # Documentos sin duplicados, por relevancia y dentro del presupuesto; se envían
+        # solo una vez en el system prompt
+        documents, stats = context_packer.pack(entity, content)
+        print(f"Contexto de {entity}: {stats['packed']}/{stats['snippets']} fragmentos, "
+              f"{stats['tokens_after']} tokens ({stats['tokens_before'] - stats['tokens_after']} ahorrados)")
         messages = [
-            {"role": "system", "content": web_summarize_prompt.format(entity=entity, documents=content)},
-            {"role": "user", "content": content}
+            {"role": "system", "content": web_summarize_prompt.format(entity=entity, documents=documents)},
+            {"role": "user", "content": entity}
         ]
-        response = llm.invoke(messages)
-        web_summary_dict[entity] = response.content
+        summary = invoke_llm(messages, template=web_summarize_prompt).content
+        if cache is not None:
+            cache.set_web_summary(entity, llm.model_name, web_summarize_prompt, summary)
+        return summary
+
+    # Un resumen por entidad, en paralelo (limitados por llm_semaphore)
+    items = list(state["entities_web_content"].items())
+    web_summary_dict = dict(zip([entity for entity, _ in items], fan_out(summarize, items)))
 
     return {"entities_web_summaries": web_summary_dict}
 
@@ -3,26 +3,27 @@ from bs4 import BeautifulSoup
 import re
 from typing import List, Dict, Optional
 
-def search_tool(query):
-    url = "http://localhost:8080/search"
-    params = {
-        "q": query,
-        "format": "json",
-        "num": 7
-    }
-    headers = {
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
-    r = requests.get(url, params=params, headers=headers)
-    r.raise_for_status()
-    return r.json()
+from agent.relevance import ContentIndex
+from agent.search_client import SearxngClient
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# Cliente compartido: conexiones persistentes, timeouts, reintentos y coalescencia
+search_client = SearxngClient()
+
+def search_tool(query, limiter=None):
+    return search_client.search(query, limiter=limiter)
 
 def extract_main_content(html_content: str) -> str:
     """
     Extrae el contenido principal del HTML usando selectores comunes
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
+    # lxml es bastante más rápido que html.parser cuando está instalado
+    soup = BeautifulSoup(html_content, HTML_PARSER)
     
     # Selectores comunes para contenido principal
     main_selectors = [
@@ -116,44 +117,71 @@ def extract_key_paragraphs(content: str, query_terms: List[str], max_paragraphs:
     
     return '\n\n'.join(top_paragraphs)
 
-def download_relevant_content(query: str, urls: List[str], max_urls: int = 3) -> List[Dict]:
+def extract_relevant_content(html_content: str, query_terms: List[str], engine: str = "index") -> str:
     """
-    Descarga y extrae solo el contenido relevante de las URLs
+    Extrae el contenido relevante para los términos de búsqueda de una página.
+    engine: "index" (índice invertido, la página se tokeniza una vez),
+    "bm25" (igual pero con ponderación BM25 en los párrafos) o "scan" (los
+    filtros originales, término a término)
+    """
+    # Extraer contenido principal
+    main_content = extract_main_content(html_content)
+
+    if len(main_content) < 100:
+        return ""
+
+    if engine == "scan":
+        # Filtrar contenido relevante
+        relevant_content = filter_relevant_content(main_content, query_terms)
+
+        # Si no hay suficiente contenido relevante, usar extracción por párrafos
+        if len(relevant_content) < 200:
+            relevant_content = extract_key_paragraphs(main_content, query_terms)
+        return relevant_content
+
+    index = ContentIndex(main_content)
+    relevant_content = index.relevant_sentences(query_terms)
+    if len(relevant_content) < 200:
+        relevant_content = index.key_paragraphs(query_terms, bm25=engine == "bm25")
+    return relevant_content
+
+def download_relevant_content(query: str, urls: List[str], max_urls: int = 3, fetcher=None,
+                              engine: str = "index") -> List[Dict]:
+    """
+    Descarga y extrae solo el contenido relevante de las URLs.
+    Con un PageFetcher las páginas se descargan a la vez en lugar de una a una
     """
     query_terms = query.split()
     results = []
-    downloaded = 0
-    
-    for url in urls:
-        if downloaded >= max_urls:
+
+    if fetcher is not None:
+        # Descargamos de golpe algunas candidatas de más por si alguna falla
+        candidates = list(urls)[:max_urls * 2]
+        pages = zip(candidates, fetcher.fetch_many(candidates))
+    else:
+        pages = ((url, None) for url in urls)
+
+    for url, html in pages:
+        if len(results) >= max_urls:
             break
-            
+
         try:
-            print(f"Descargando: {url}")
-            r = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-            r.raise_for_status()
-            
-            # Extraer contenido principal
-            main_content = extract_main_content(r.text)
-            
-            if len(main_content) < 100:
-                print(f"Contenido muy corto en {url}, saltando...")
+            if fetcher is None:
+                print(f"Descargando: {url}")
+                r = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
+                r.raise_for_status()
+                html = r.text
+            if html is None:
                 continue
-            
-            # Filtrar contenido relevante
-            relevant_content = filter_relevant_content(main_content, query_terms)
-            
-            # Si no hay suficiente contenido relevante, usar extracción por párrafos
-            if len(relevant_content) < 200:
-                relevant_content = extract_key_paragraphs(main_content, query_terms)
-            
+
+            relevant_content = extract_relevant_content(html, query_terms, engine)
+
             if relevant_content:
                 results.append({
                     'url': url,
                     'content': relevant_content,
                     'length': len(relevant_content)
                 })
-                downloaded += 1
                 print(f"✓ Contenido relevante extraído ({len(relevant_content)} caracteres)")
             else:
                 print(f"No se encontró contenido relevante en {url}")
@@ -161,4 +189,4 @@ def download_relevant_content(query: str, urls: List[str], max_urls: int = 3) ->
         except Exception as e:
             print(f"Error descargando {url}: {e}")
     
-    return results
\ No newline at end of file
+    return results
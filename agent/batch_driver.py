@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+from agent import agent
+from agent.agent_tools import search_client
+
+
+def build_example(video_id: str, data_folder: str = "./data", transcripts_folder: str = "./transcripts") -> Dict:
+    """
+    Construye la entrada del agente (descripción + transcripción) de un video
+    """
+    description_path = f"{data_folder}/tiktok_data_{video_id}.json"
+    with open(description_path, "r", encoding="utf-8") as f:
+        description = json.load(f)["basic_info"]["description"]
+
+    transcript_path = f"{transcripts_folder}/tiktok_video_{video_id}.txt"
+    with open(transcript_path, "r", encoding="utf-8") as f:
+        transcript = f.read()
+    return {
+        "text": f"Descripción: {description}\nTranscripción: {transcript}"
+    }
+
+
+def write_result(video_id: str, result: Dict, result_folder: str = "./results") -> str:
+    """
+    Guarda el resultado del agente de un video
+    """
+    os.makedirs(result_folder, exist_ok=True)
+    result_path = f"{result_folder}/result_{video_id}.json"
+    with open(result_path, "w") as f:
+        json.dump(result, f)
+    return result_path
+
+
+async def run_agent_batch(video_ids: List[str], concurrency: int = 4, data_folder: str = "./data",
+                          transcripts_folder: str = "./transcripts", result_folder: str = "./results",
+                          on_done: Optional[Callable[[str], None]] = None) -> Dict:
+    """
+    Ejecuta el agente sobre varios videos a la vez con concurrencia acotada.
+
+    Cada resultado se escribe en cuanto su video termina y un fallo solo afecta
+    a ese video. Devuelve un resumen con throughput en videos/min y tokens/s.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    done, failed = [], []
+    tokens_before = agent.token_usage.snapshot()
+    context_before = agent.context_packer.snapshot()
+    start = time.perf_counter()
+
+    async def process(video_id: str):
+        async with semaphore:
+            print(f"Processing video ID: {video_id}")
+            video_start = time.perf_counter()
+            try:
+                example = build_example(video_id, data_folder, transcripts_folder)
+                result = await agent.app.ainvoke(example)
+                write_result(video_id, result, result_folder)
+            except Exception as e:
+                print(f"Error procesando el video {video_id}: {e}")
+                failed.append(video_id)
+                return
+            done.append(video_id)
+            print(f"Video {video_id} terminado en {time.perf_counter() - video_start:.1f} s "
+                  f"({len(done)}/{len(video_ids)})")
+            if on_done is not None:
+                on_done(video_id)
+
+    await asyncio.gather(*(process(video_id) for video_id in video_ids))
+
+    elapsed = time.perf_counter() - start
+    tokens_after = agent.token_usage.snapshot()
+    input_tokens = tokens_after["input_tokens"] - tokens_before["input_tokens"]
+    output_tokens = tokens_after["output_tokens"] - tokens_before["output_tokens"]
+    summary = {
+        "done": len(done),
+        "failed": failed,
+        "elapsed_seconds": elapsed,
+        "videos_per_minute": len(done) / elapsed * 60 if elapsed > 0 else 0.0,
+        "llm_calls": tokens_after["calls"] - tokens_before["calls"],
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "output_tokens_per_second": output_tokens / elapsed if elapsed > 0 else 0.0,
+        "total_tokens_per_second": (input_tokens + output_tokens) / elapsed if elapsed > 0 else 0.0,
+    }
+
+    print("\n=== AGENTE ===")
+    print(f"Videos: {summary['done']} ok, {len(failed)} fallidos en {elapsed:.1f} s "
+          f"({summary['videos_per_minute']:.2f} videos/min)")
+    print(f"Tokens: {input_tokens} de entrada, {output_tokens} generados en {summary['llm_calls']} llamadas "
+          f"({summary['output_tokens_per_second']:.1f} tokens/s generados, "
+          f"{summary['total_tokens_per_second']:.1f} tokens/s en total)")
+    context_after = agent.context_packer.snapshot()
+    context_saved = (context_after["tokens_before"] - context_before["tokens_before"]) - \
+        (context_after["tokens_after"] - context_before["tokens_after"])
+    summary["context_tokens_saved"] = context_saved
+    print(f"Contexto web: {context_saved} tokens de prompt ahorrados en "
+          f"{context_after['calls'] - context_before['calls']} resúmenes")
+    search_stats = search_client.stats()
+    summary["search"] = search_stats
+    print(f"SearXNG: {search_stats['requests']} peticiones, {search_stats['retried']} reintentos, "
+          f"{search_stats['coalesced']} consultas repetidas agrupadas")
+    if agent.llm_cache is not None:
+        cache_stats = agent.llm_cache.stats()
+        summary["llm_cache"] = cache_stats
+        print(f"Caché del LLM: {cache_stats['hits']} aciertos, {cache_stats['misses']} fallos, "
+              f"{cache_stats['entries']} entradas ({cache_stats['bytes'] / (1024 * 1024):.1f} MB)")
+    if agent.entity_cache is not None:
+        entity_stats = agent.entity_cache.stats()
+        summary["entity_cache"] = entity_stats
+        print(f"Caché de entidades: {entity_stats['hits']} aciertos, {entity_stats['misses']} fallos")
+    return summary
@@ -0,0 +1,233 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from agent.entity_cache import normalize_entity
+from agent.entity_index import split_entity, tokenize
+
+# Separador que usa web_download_node entre resultados de búsqueda
+DOCUMENT_SEPARATOR = "NEW DOCUMENT:\n"
+
+
+def tokenize_url(llm_base_url: str) -> str:
+    """URL de /tokenize de llama.cpp a partir de la base de la API compatible con OpenAI (.../v1)"""
+    base = llm_base_url.rstrip("/")
+    if base.endswith("/v1"):
+        base = base[:-len("/v1")]
+    return base + "/tokenize"
+
+
+class Tokenizer:
+    """
+    Cuenta tokens con el tokenizador del modelo (endpoint /tokenize de llama.cpp).
+    Sin url, o si el servidor no tiene el endpoint (404, como LM Studio), se
+    estima a razón de chars_per_token caracteres por token. Los errores
+    transitorios solo afectan a ese texto, salvo que se repitan max_failures
+    veces seguidas. Los recuentos se memorizan por texto, porque los mismos
+    snippets se repiten entre resultados y entre videos.
+    """
+
+    def __init__(self, url: Optional[str] = None, timeout: float = 5, chars_per_token: float = 3.5,
+                 max_failures: int = 3, memo_size: int = 4096):
+        self.url = url
+        self.timeout = timeout
+        self.chars_per_token = chars_per_token
+        self.max_failures = max_failures
+        self.memo_size = memo_size
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._memo: "OrderedDict[str, int]" = OrderedDict()
+        self._failures = 0
+        self.requests = 0
+
+    def estimate(self, text: str) -> int:
+        return int(len(text) / self.chars_per_token) + 1 if text else 0
+
+    def _disable(self, reason: str):
+        with self._lock:
+            if self.url is not None:
+                print(f"Tokenizador del servidor no disponible ({reason}); se estimarán los tokens")
+                self.url = None
+
+    def _remote_count(self, text: str) -> Optional[int]:
+        url = self.url
+        if url is None:
+            return None
+        try:
+            with self._lock:
+                self.requests += 1
+            r = self._session.post(url, json={"content": text}, timeout=self.timeout)
+            if r.status_code in (404, 405, 501):
+                # El servidor no tiene el endpoint: no tiene sentido volver a intentarlo
+                self._disable(f"{r.status_code} en {url}")
+                return None
+            r.raise_for_status()
+            tokens = len(r.json()["tokens"])
+        except Exception as e:
+            with self._lock:
+                self._failures += 1
+                failures = self._failures
+            if failures >= self.max_failures:
+                self._disable(str(e))
+            return None
+        with self._lock:
+            self._failures = 0
+        return tokens
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        with self._lock:
+            if text in self._memo:
+                self._memo.move_to_end(text)
+                return self._memo[text]
+        tokens = self._remote_count(text)
+        if tokens is None:
+            # Las estimaciones no se memorizan: son baratas y el servidor puede volver
+            return self.estimate(text)
+        with self._lock:
+            self._memo[text] = tokens
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return tokens
+
+
+def chunk_document(text: str, max_chars: int = 600) -> List[str]:
+    """
+    Parte un documento largo (el texto de una página completa) en trozos del
+    tamaño de un snippet, por párrafos y, si un párrafo no cabe, por oraciones.
+    Así el empaquetado puede quedarse con las partes relevantes de la página
+    en lugar de descartarla entera por no caber en el presupuesto
+    """
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n|\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            # Oraciones más largas que un trozo se cortan por el último espacio
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:].strip()
+            if sentence:
+                pieces.append(sentence)
+
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_documents(content: str) -> List[str]:
+    return [doc.strip() for doc in content.split(DOCUMENT_SEPARATOR) if doc.strip()]
+
+
+def _fingerprint(text: str) -> str:
+    # Dos fragmentos iguales salvo mayúsculas, tildes o puntuación cuentan como duplicados
+    return hashlib.sha1(normalize_entity(text).encode("utf-8")).hexdigest()
+
+
+def dedupe_snippets(snippets: List[str]) -> List[str]:
+    """
+    Quita fragmentos repetidos y los contenidos en otro más largo (el mismo
+    snippet suele aparecer en varios resultados de búsqueda)
+    """
+    seen, unique = set(), []
+    for snippet in snippets:
+        key = _fingerprint(snippet)
+        if key not in seen:
+            seen.add(key)
+            unique.append(snippet)
+    normalized = [normalize_entity(snippet) for snippet in unique]
+    return [
+        snippet for i, snippet in enumerate(unique)
+        if not any(i != j and len(other) > len(normalized[i]) and normalized[i] in other
+                   for j, other in enumerate(normalized))
+    ]
+
+
+def score_snippet(snippet: str, name_tokens, location_tokens, rank: int) -> float:
+    """
+    Relevancia de un fragmento para la entidad: palabras del nombre que
+    aparecen (pesan más que las de la localización) y posición en el buscador
+    """
+    tokens = tokenize(normalize_entity(snippet))
+    name_score = len(name_tokens & tokens) / len(name_tokens) if name_tokens else 0.0
+    location_score = len(location_tokens & tokens) / len(location_tokens) if location_tokens else 0.0
+    return 2 * name_score + 0.5 * location_score + 1 / (1 + rank)
+
+
+class ContextPacker:
+    """
+    Prepara los documentos web de una entidad para el prompt de resumen:
+    elimina duplicados, los ordena por relevancia y los mete en un presupuesto
+    de tokens. Lleva la cuenta de los tokens ahorrados respecto a enviar todo
+    el contenido dos veces (como system prompt y como mensaje de usuario).
+    """
+
+    def __init__(self, budget_tokens: int = 1500, tokenizer: Optional[Tokenizer] = None):
+        self.budget_tokens = budget_tokens
+        self.tokenizer = tokenizer or Tokenizer()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def pack(self, entity: str, content: str) -> Tuple[str, Dict]:
+        documents = split_documents(content)
+        snippets = dedupe_snippets(documents)
+        name, location = split_entity(entity)
+        name_tokens, location_tokens = tokenize(name), tokenize(location)
+        ranked = sorted(
+            enumerate(snippets),
+            key=lambda item: score_snippet(item[1], name_tokens, location_tokens, item[0]),
+            reverse=True,
+        )
+
+        packed, used = [], 0
+        for _, snippet in ranked:
+            tokens = self.tokenizer.count(snippet)
+            if used + tokens > self.budget_tokens:
+                # Un fragmento que no cabe se salta; alguno más corto puede caber todavía
+                continue
+            packed.append(snippet)
+            used += tokens
+        if not packed and ranked:
+            # Ni el mejor fragmento cabe: se recorta a lo que permite el presupuesto
+            snippet = ranked[0][1][:int(self.budget_tokens * self.tokenizer.chars_per_token)]
+            packed.append(snippet)
+            used = self.tokenizer.count(snippet)
+
+        context = DOCUMENT_SEPARATOR.join(f"{snippet}\n" for snippet in packed)
+        stats = {
+            "snippets": len(snippets),
+            "packed": len(packed),
+            # Contenido completo sin empaquetar, contado por documento para reutilizar los recuentos
+            "tokens_before": 2 * (sum(self.tokenizer.count(doc) for doc in documents)
+                                  + len(documents) * self.tokenizer.count(DOCUMENT_SEPARATOR)),
+            "tokens_after": used,
+        }
+        with self._lock:
+            self.calls += 1
+            self.tokens_before += stats["tokens_before"]
+            self.tokens_after += stats["tokens_after"]
+        return context, stats
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"calls": self.calls, "tokens_before": self.tokens_before, "tokens_after": self.tokens_after}
@@ -0,0 +1,52 @@
+import hashlib
+import re
+import unicodedata
+from typing import Dict, Optional
+
+from pipeline.disk_cache import DiskLRUCache
+
+
+def normalize_entity(entity: str) -> str:
+    """
+    Normaliza el nombre de una entidad: sin tildes, en minúsculas y con los
+    espacios y la puntuación unificados
+    """
+    text = unicodedata.normalize("NFKD", entity)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = re.sub(r"\s*,\s*", ", ", text)
+    text = re.sub(r"[^\w, ]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip(" ,")
+
+
+class EntityCache:
+    """
+    Conocimiento web por entidad compartido entre videos.
+
+    Guarda los resultados de búsqueda y el resumen web de cada entidad
+    normalizada, de modo que cada entidad distinta se busca y se resume una
+    sola vez por corpus (hasta que caduca el TTL).
+    """
+
+    def __init__(self, path: str, ttl_days: float = 30, max_mb: int = 256):
+        self.store = DiskLRUCache(path, max_bytes=max_mb * 1024 * 1024, ttl_seconds=ttl_days * 24 * 3600)
+
+    def get_web_content(self, entity: str, query_suffix: str) -> Optional[str]:
+        return self.store.get(f"web_content:{query_suffix}:{normalize_entity(entity)}")
+
+    def set_web_content(self, entity: str, query_suffix: str, content: str):
+        self.store.set(f"web_content:{query_suffix}:{normalize_entity(entity)}", content)
+
+    @staticmethod
+    def _summary_key(entity: str, model: str, template: str) -> str:
+        # El resumen depende también del modelo y del prompt
+        template_hash = hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+        return f"web_summary:{model}:{template_hash}:{normalize_entity(entity)}"
+
+    def get_web_summary(self, entity: str, model: str, template: str) -> Optional[str]:
+        return self.store.get(self._summary_key(entity, model, template))
+
+    def set_web_summary(self, entity: str, model: str, template: str, summary: str):
+        self.store.set(self._summary_key(entity, model, template), summary)
+
+    def stats(self) -> Dict:
+        return self.store.stats()
@@ -0,0 +1,135 @@
+import threading
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Set, Tuple
+
+from agent.entity_cache import normalize_entity
+
+# Palabras que no distinguen entidades ("La Sagrada Família" == "Sagrada Familia")
+STOPWORDS = {
+    "el", "la", "los", "las", "un", "una", "de", "del", "y", "en",
+    "the", "a", "an", "of", "and", "at", "in",
+    "le", "les", "du", "des", "il", "lo", "di", "da", "do", "dos",
+}
+
+
+def split_entity(entity: str) -> Tuple[str, str]:
+    """
+    Separa "Entidad, Ciudad, País" en nombre y localización (como en data-cleaning)
+    """
+    name, _, location = normalize_entity(entity).partition(",")
+    return name.strip(), location.strip()
+
+
+def tokenize(text: str) -> Set[str]:
+    return {token for token in text.replace(",", " ").split() if token not in STOPWORDS}
+
+
+def _tokens_match(a: str, b: str, min_ratio: float) -> bool:
+    if a == b:
+        return True
+    # Tolerancia a erratas solo en palabras largas
+    return min(len(a), len(b)) >= 4 and SequenceMatcher(None, a, b).ratio() >= min_ratio
+
+
+def token_set_similarity(a: Set[str], b: Set[str], min_token_ratio: float = 0.85) -> float:
+    """
+    Similitud de Jaccard entre conjuntos de palabras, aceptando erratas
+    """
+    if not a or not b:
+        return 0.0
+    matched = 0
+    remaining = set(b)
+    for token in a:
+        match = next((other for other in remaining if _tokens_match(token, other, min_token_ratio)), None)
+        if match is not None:
+            remaining.discard(match)
+            matched += 1
+    return matched / (len(a) + len(b) - matched)
+
+
+def locations_compatible(a: Set[str], b: Set[str]) -> bool:
+    """
+    Sin localización en alguna de las dos, o una contenida en la otra
+    ("Barcelona" es compatible con "Barcelona, Spain")
+    """
+    return not a or not b or a <= b or b <= a
+
+
+class EntityIndex:
+    """
+    Índice de canonicalización de entidades.
+
+    Cada entidad nueva se compara solo con las que comparten alguna clave de
+    bloqueo (palabra del nombre o sus 4 primeras letras), en lugar de con
+    todas, así que escala a decenas de miles de entidades. Si la similitud de
+    nombres supera el umbral y las localizaciones son compatibles, se devuelve
+    la forma canónica (la primera que se vio); si no, la entidad pasa a ser
+    canónica.
+    """
+
+    def __init__(self, threshold: float = 0.75, max_block_size: int = 500):
+        self.threshold = threshold
+        self.max_block_size = max_block_size
+        self._lock = threading.Lock()
+        self._canonical: List[Tuple[str, Set[str], Set[str]]] = []
+        self._blocks: Dict[str, List[int]] = defaultdict(list)
+        self._resolved: Dict[str, str] = {}
+
+    @staticmethod
+    def _block_keys(name_tokens: Set[str]) -> Set[str]:
+        return {f"t:{token}" for token in name_tokens} | {f"p:{token[:4]}" for token in name_tokens if len(token) >= 4}
+
+    def _candidates(self, keys: Set[str]) -> Set[int]:
+        blocks = [self._blocks[key] for key in keys if key in self._blocks]
+        # Las claves muy frecuentes ("restaurante", "hotel") no discriminan: se ignoran si hay otras
+        selective = [block for block in blocks if len(block) <= self.max_block_size]
+        candidates = set()
+        for block in selective or blocks:
+            candidates.update(block)
+        return candidates
+
+    def canonicalize(self, entity: str) -> str:
+        """Devuelve la forma canónica de la entidad, registrándola si es nueva"""
+        with self._lock:
+            resolved = self._resolved.get(entity)
+            if resolved is not None:
+                return resolved
+
+            name, location = split_entity(entity)
+            name_tokens, location_tokens = tokenize(name), tokenize(location)
+            keys = self._block_keys(name_tokens)
+
+            best, best_score = None, self.threshold
+            for index in self._candidates(keys):
+                canonical, canonical_name, canonical_location = self._canonical[index]
+                if not locations_compatible(location_tokens, canonical_location):
+                    continue
+                score = token_set_similarity(name_tokens, canonical_name)
+                if score >= best_score:
+                    best, best_score = canonical, score
+
+            if best is None:
+                best = entity
+                self._canonical.append((entity, name_tokens, location_tokens))
+                for key in keys:
+                    self._blocks[key].append(len(self._canonical) - 1)
+
+            self._resolved[entity] = best
+            return best
+
+    def canonical_map(self, entities: Iterable[str]) -> Dict[str, str]:
+        return {entity: self.canonicalize(entity) for entity in entities}
+
+
+def merge_by_canonical(values: Dict[str, str], index: EntityIndex) -> Dict[str, str]:
+    """
+    Reindexa un diccionario entidad -> texto por su forma canónica, quedándose
+    con el texto más largo si varias variantes colisionan
+    """
+    merged = {}
+    for entity, value in values.items():
+        canonical = index.canonicalize(entity)
+        if canonical not in merged or len(str(value)) > len(str(merged[canonical])):
+            merged[canonical] = value
+    return merged
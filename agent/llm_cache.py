@@ -0,0 +1,38 @@
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+from pipeline.disk_cache import DiskLRUCache
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Caché en disco de respuestas del LLM compartida por los nodos del agente.
+
+    La clave es (modelo, hash de la plantilla del prompt, mensajes renderizados),
+    así que cualquier cambio en el modelo, el prompt o la entrada es un fallo.
+    """
+
+    def __init__(self, path: str, max_mb: int = 128):
+        self.store = DiskLRUCache(path, max_bytes=max_mb * 1024 * 1024)
+
+    @staticmethod
+    def key(model: str, template: str, messages: List[Dict]) -> str:
+        payload = json.dumps(
+            {"model": model, "template": _sha256(template), "messages": messages},
+            sort_keys=True, ensure_ascii=False
+        )
+        return _sha256(payload)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.store.get(key)
+
+    def set(self, key: str, content: str):
+        self.store.set(key, content)
+
+    def stats(self) -> Dict:
+        return self.store.stats()
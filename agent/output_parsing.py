@@ -0,0 +1,112 @@
+import ast
+import json
+import re
+from typing import Any, Dict
+
+# Esquemas JSON de las salidas estructuradas del agente
+NER_SCHEMA = {
+    "type": "object",
+    "additionalProperties": {"type": "string"},
+}
+
+SUMMARIES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "Summaries": {
+            "type": "object",
+            "additionalProperties": {"type": "string"},
+        }
+    },
+    "required": ["Summaries"],
+}
+
+
+class OutputParsingError(ValueError):
+    """La salida del LLM no se pudo convertir en el objeto esperado"""
+
+
+def json_schema_format(name: str, schema: Dict) -> Dict:
+    """
+    response_format para endpoints compatibles con OpenAI (llama.cpp, LM Studio...)
+    que restringe la generación al esquema
+    """
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema}}
+
+
+def _extract_block(text: str) -> str:
+    # Quitamos razonamiento y bloques de código markdown
+    text = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL)
+    fenced = re.search(r"```(?:json|python)?\s*(.*?)```", text, flags=re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+
+    # Primer objeto/lista completo, respetando cadenas
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        return text.strip()
+    stack, in_string, escaped = [], None, False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == in_string:
+                in_string = None
+        elif c in "\"'":
+            in_string = c
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+        elif c in "}]":
+            if stack and c == stack[-1]:
+                stack.pop()
+            if not stack:
+                return text[start:i + 1]
+    # Salida truncada: cerramos la cadena y lo que quedó abierto
+    block = text[start:]
+    if in_string:
+        if escaped:
+            block = block[:-1]
+        block += in_string
+    return block + "".join(reversed(stack))
+
+
+def parse_json_tolerant(text: str) -> Any:
+    """
+    Convierte la salida del LLM en un objeto Python. Acepta JSON, literales de
+    Python, bloques ```json```, texto alrededor, comas finales y salidas truncadas
+    """
+    block = _extract_block(text)
+    candidates = [block, re.sub(r",\s*([}\]])", r"\1", block)]
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except (ValueError, RecursionError, MemoryError):
+            pass
+        try:
+            return ast.literal_eval(candidate)
+        # Claves no hashables ({[1]: 2}) dan TypeError y el anidamiento excesivo RecursionError
+        except (ValueError, SyntaxError, TypeError, RecursionError, MemoryError):
+            pass
+    raise OutputParsingError(f"No se pudo parsear la salida del LLM: {text[:200]!r}")
+
+
+def parse_entities(text: str) -> Dict[str, str]:
+    parsed = parse_json_tolerant(text)
+    if isinstance(parsed, list):
+        # Lista de entidades sin descripción
+        parsed = {str(entity): "" for entity in parsed}
+    if not isinstance(parsed, dict):
+        raise OutputParsingError(f"Se esperaba un diccionario de entidades: {text[:200]!r}")
+    return {str(k): str(v) for k, v in parsed.items()}
+
+
+def parse_summaries(text: str) -> Dict[str, str]:
+    parsed = parse_json_tolerant(text)
+    if not isinstance(parsed, dict):
+        raise OutputParsingError(f"Se esperaba un diccionario de resúmenes: {text[:200]!r}")
+    summaries = parsed.get("Summaries", parsed)
+    if not isinstance(summaries, dict):
+        raise OutputParsingError(f"'Summaries' debe ser un diccionario: {text[:200]!r}")
+    return {str(k): str(v) for k, v in summaries.items()}
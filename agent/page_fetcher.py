@@ -0,0 +1,127 @@
+import asyncio
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+class PageFetcher:
+    """
+    Descarga páginas web con aiohttp desde un bucle de eventos propio en un
+    hilo de fondo, para poder usarlo desde los nodos síncronos del grafo.
+
+    Reutiliza las conexiones (pool compartido), limita las conexiones
+    simultáneas en total y por host, corta las respuestas que superan
+    max_bytes y, con respect_robots, no descarga lo que el robots.txt del
+    sitio no permite (se lee una vez por sitio). Requiere `pip install aiohttp`.
+    """
+
+    def __init__(self, max_connections: int = 16, per_host: int = 2, timeout: float = 10,
+                 max_bytes: int = 2 * 1024 * 1024, headers: Optional[dict] = None, respect_robots: bool = True):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.headers = headers or DEFAULT_HEADERS
+        self.respect_robots = respect_robots
+        self._robots: Dict[str, asyncio.Future] = {}
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            import aiohttp
+
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=loop.run_forever, name="page-fetcher", daemon=True)
+            self._thread.start()
+
+            async def create_session():
+                connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.per_host)
+                return aiohttp.ClientSession(
+                    connector=connector,
+                    headers=self.headers,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                )
+
+            self._session = asyncio.run_coroutine_threadsafe(create_session(), loop).result()
+            self._loop = loop
+
+    async def _load_robots(self, origin: str) -> Optional[RobotFileParser]:
+        """robots.txt del sitio; None (se permite todo) si no existe o no se puede leer"""
+        try:
+            async with self._session.get(origin + "/robots.txt") as r:
+                if r.status != 200:
+                    return None
+                text = (await r.content.read(512 * 1024)).decode(r.charset or "utf-8", errors="replace")
+        except Exception:
+            return None
+        parser = RobotFileParser()
+        parser.parse(text.splitlines())
+        return parser
+
+    async def _allowed(self, url: str) -> bool:
+        if not self.respect_robots:
+            return True
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        # Las descargas simultáneas del mismo sitio esperan a la misma lectura del robots.txt
+        if origin not in self._robots:
+            self._robots[origin] = asyncio.ensure_future(self._load_robots(origin))
+        robots = await self._robots[origin]
+        return robots is None or robots.can_fetch(self.headers.get("User-Agent", "*"), url)
+
+    async def _fetch(self, url: str) -> Optional[str]:
+        try:
+            if not await self._allowed(url):
+                print(f"Saltando {url}: no permitido por robots.txt")
+                return None
+            async with self._session.get(url) as r:
+                r.raise_for_status()
+                content_type = r.headers.get("Content-Type", "")
+                if content_type and "html" not in content_type:
+                    print(f"Saltando {url}: no es HTML ({content_type})")
+                    return None
+                # Leemos por bloques para no descargar más de max_bytes
+                chunks, size = [], 0
+                async for chunk in r.content.iter_chunked(64 * 1024):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= self.max_bytes:
+                        print(f"Respuesta de {url} recortada a {self.max_bytes} bytes")
+                        break
+                body = b"".join(chunks)[:self.max_bytes]
+                return body.decode(r.charset or "utf-8", errors="replace")
+        except Exception as e:
+            print(f"Error descargando {url}: {e}")
+            return None
+
+    async def _fetch_all(self, urls: List[str]) -> List[Optional[str]]:
+        return await asyncio.gather(*(self._fetch(url) for url in urls))
+
+    def fetch_many(self, urls: List[str]) -> List[Optional[str]]:
+        """
+        Descarga las URLs a la vez y devuelve el HTML de cada una en el mismo
+        orden (None si falló)
+        """
+        if not urls:
+            return []
+        self._start()
+        return asyncio.run_coroutine_threadsafe(self._fetch_all(list(urls)), self._loop).result()
+
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = self._thread = self._session = None
+            self._robots = {}
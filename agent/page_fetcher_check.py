@@ -0,0 +1,188 @@
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Tuple
+
+from agent.agent_tools import download_relevant_content
+from agent.page_fetcher import PageFetcher
+
+PAGE_DELAY = 0.3
+
+PAGE_HTML = """<html><head><title>Bar Pepe {n}</title></head><body><main>
+<p>Bar Pepe in Madrid is a small tapas bar near Plaza Mayor with a long review history.</p>
+<p>Reviews of Bar Pepe praise the croquetas and the friendly staff, although prices went up.</p>
+<p>Unrelated filler about the weather in another city.</p>
+</main></body></html>"""
+
+
+class StandInServer:
+    """Local HTTP server with the cases PageFetcher has to handle."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.page_connections = set()
+        self.paths = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so reused connections can be counted
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send_body(self, body: bytes, content_type: str = "text/html; charset=utf-8", status: int = 200):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up first (timeout and size cap checks)
+                    pass
+
+            def do_GET(self):
+                with server.lock:
+                    server.paths.append(self.path)
+                if self.path == "/robots.txt":
+                    self.send_body(b"User-agent: *\nDisallow: /private\n", "text/plain")
+                elif self.path.startswith("/page/"):
+                    with server.lock:
+                        server.in_flight += 1
+                        server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                        server.page_connections.add(self.client_address)
+                    time.sleep(PAGE_DELAY)
+                    with server.lock:
+                        server.in_flight -= 1
+                    self.send_body(PAGE_HTML.format(n=self.path.rsplit("/", 1)[-1]).encode("utf-8"))
+                elif self.path == "/slow":
+                    time.sleep(3)
+                    self.send_body(b"<html>late</html>")
+                elif self.path == "/big":
+                    self.send_body(b"<html>" + b"x" * (3 * 1024 * 1024) + b"</html>")
+                elif self.path == "/data.json":
+                    self.send_body(b'{"not": "html"}', "application/json")
+                elif self.path.startswith("/private"):
+                    self.send_body(b"<html>private</html>")
+                else:
+                    self.send_body(b"not found", "text/plain", status=404)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def check_per_host_limit(server: StandInServer, pages: int, per_host: int) -> str:
+    fetcher = PageFetcher(per_host=per_host)
+    try:
+        start = time.perf_counter()
+        bodies = fetcher.fetch_many([f"{server.base_url}/page/{i}" for i in range(pages)])
+        elapsed = time.perf_counter() - start
+    finally:
+        fetcher.close()
+    assert all(body and "Bar Pepe" in body for body in bodies), "some pages failed"
+    assert server.max_in_flight <= per_host, f"{server.max_in_flight} simultaneous requests > per_host={per_host}"
+    assert len(server.page_connections) <= per_host, \
+        f"{len(server.page_connections)} connections for {pages} pages (not reused)"
+    return (f"{pages} pages in {elapsed:.2f} s, max {server.max_in_flight} in flight, "
+            f"{len(server.page_connections)} connections")
+
+
+def check_timeout(server: StandInServer) -> str:
+    fetcher = PageFetcher(timeout=1, respect_robots=False)
+    try:
+        start = time.perf_counter()
+        body = fetcher.fetch_many([f"{server.base_url}/slow"])[0]
+        elapsed = time.perf_counter() - start
+    finally:
+        fetcher.close()
+    assert body is None, "slow page was not cut off"
+    assert elapsed < 2.5, f"timeout took {elapsed:.1f} s"
+    return f"gave up after {elapsed:.2f} s"
+
+
+def check_size_cap(server: StandInServer, max_bytes: int = 100_000) -> str:
+    fetcher = PageFetcher(max_bytes=max_bytes)
+    try:
+        body = fetcher.fetch_many([f"{server.base_url}/big"])[0]
+    finally:
+        fetcher.close()
+    assert body is not None and len(body.encode("utf-8")) <= max_bytes, "response not capped"
+    return f"3 MB response capped to {len(body)} bytes"
+
+
+def check_skips(server: StandInServer) -> str:
+    fetcher = PageFetcher()
+    try:
+        json_body, private_body = fetcher.fetch_many([f"{server.base_url}/data.json", f"{server.base_url}/private/1"])
+    finally:
+        fetcher.close()
+    assert json_body is None, "non-HTML response was returned"
+    assert private_body is None, "robots.txt was ignored"
+    robots_requests = server.paths.count("/robots.txt")
+    assert robots_requests == 1, f"robots.txt requested {robots_requests} times"
+
+    fetcher = PageFetcher(respect_robots=False)
+    try:
+        private_body = fetcher.fetch_many([f"{server.base_url}/private/1"])[0]
+    finally:
+        fetcher.close()
+    assert private_body is not None, "respect_robots=False still skipped the page"
+    return "non-HTML and robots.txt-disallowed pages skipped, robots.txt read once"
+
+
+def check_relevant_content(server: StandInServer) -> str:
+    fetcher = PageFetcher()
+    try:
+        urls = [f"{server.base_url}/private/1", f"{server.base_url}/page/a", f"{server.base_url}/page/b"]
+        results = download_relevant_content("Bar Pepe review", urls, max_urls=2, fetcher=fetcher)
+    finally:
+        fetcher.close()
+    assert [r["url"] for r in results] == urls[1:], f"unexpected pages: {[r['url'] for r in results]}"
+    assert all("Bar Pepe" in r["content"] for r in results), "relevant text not extracted"
+    return f"{len(results)} pages, {sum(r['length'] for r in results)} relevant characters"
+
+
+def run_checks(pages: int, per_host: int) -> List[Tuple[str, bool, str]]:
+    checks: List[Tuple[str, Callable]] = [
+        ("per-host limit", lambda server: check_per_host_limit(server, pages, per_host)),
+        ("timeout", check_timeout),
+        ("size cap", check_size_cap),
+        ("skipped pages", check_skips),
+        ("relevant content", check_relevant_content),
+    ]
+    results = []
+    for name, check in checks:
+        # A fresh server per check, so counters do not leak between them
+        with StandInServer() as server:
+            try:
+                results.append((name, True, check(server)))
+            except AssertionError as e:
+                results.append((name, False, str(e)))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check PageFetcher against a local HTTP stand-in server.")
+    parser.add_argument("--pages", help="Pages fetched in the per-host limit check", type=int, default=8)
+    parser.add_argument("--per-host", help="Per-host connection limit to check", type=int, default=2)
+    args = parser.parse_args()
+
+    results = run_checks(args.pages, args.per_host)
+    for name, ok, detail in results:
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<18} {detail}")
+    if not all(ok for _, ok, _ in results):
+        raise SystemExit(1)
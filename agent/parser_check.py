@@ -0,0 +1,78 @@
+from typing import Callable, List, Tuple
+
+from agent.output_parsing import OutputParsingError, parse_entities, parse_summaries
+
+# LLM outputs the tolerant parser has to accept, with the expected result
+ENTITY_OUTPUTS = [
+    ('{"Bar Pepe": "bar de tapas", "Madrid": "ciudad"}', {"Bar Pepe": "bar de tapas", "Madrid": "ciudad"}),
+    ('<think>Busco lugares...</think>\n```json\n{"Bar Pepe": "bar"}\n```', {"Bar Pepe": "bar"}),
+    ("Entidades: {'Bar Pepe': 'bar', 'Madrid': 'ciudad',}", {"Bar Pepe": "bar", "Madrid": "ciudad"}),
+    ('["Bar Pepe", "Madrid"]', {"Bar Pepe": "", "Madrid": ""}),
+    ('{"Bar Pepe": "bar de tapas en la Plaza', {"Bar Pepe": "bar de tapas en la Plaza"}),
+    ('{"Bar Pepe": "dice \\"hola\\"", "Madrid": 3}', {"Bar Pepe": 'dice "hola"', "Madrid": "3"}),
+]
+
+SUMMARY_OUTPUTS = [
+    ('{"Summaries": {"Bar Pepe": "Bar en Madrid."}}', {"Bar Pepe": "Bar en Madrid."}),
+    ('{"Bar Pepe": "Bar en Madrid."}', {"Bar Pepe": "Bar en Madrid."}),
+    ('Aquí está: {"Summaries": {"Bar Pepe": "Bar', {"Bar Pepe": "Bar"}),
+]
+
+# Outputs that must fail with OutputParsingError, never with another exception
+MALFORMED_OUTPUTS = [
+    "",
+    "No he encontrado entidades.",
+    "{[1]: 2}",
+    "{{1, 2}: 'a'}",
+    "[" * 2000,
+    "{" + '"a": {' * 5000,
+    '{"a": ' * 100000,
+    "{'a': 1 +}",
+    "{'a': __import__('os')}",
+    "42",
+]
+
+
+def check_accepted() -> str:
+    for text, expected in ENTITY_OUTPUTS:
+        result = parse_entities(text)
+        assert result == expected, f"parse_entities({text!r}) gave {result}"
+    for text, expected in SUMMARY_OUTPUTS:
+        result = parse_summaries(text)
+        assert result == expected, f"parse_summaries({text!r}) gave {result}"
+    return f"{len(ENTITY_OUTPUTS)} entity and {len(SUMMARY_OUTPUTS)} summary outputs parsed"
+
+
+def check_malformed() -> str:
+    for parse in (parse_entities, parse_summaries):
+        for text in MALFORMED_OUTPUTS:
+            try:
+                result = parse(text)
+            except OutputParsingError:
+                continue
+            except Exception as e:
+                raise AssertionError(f"{parse.__name__}({text[:20]!r}...) raised {type(e).__name__}: {e}")
+            raise AssertionError(f"{parse.__name__}({text[:20]!r}...) accepted as {result!r}")
+    return f"{len(MALFORMED_OUTPUTS)} malformed outputs rejected with OutputParsingError"
+
+
+def run_checks() -> List[Tuple[str, bool, str]]:
+    checks: List[Tuple[str, Callable]] = [
+        ("accepted outputs", check_accepted),
+        ("malformed outputs", check_malformed),
+    ]
+    results = []
+    for name, check in checks:
+        try:
+            results.append((name, True, check()))
+        except AssertionError as e:
+            results.append((name, False, str(e)))
+    return results
+
+
+if __name__ == "__main__":
+    results = run_checks()
+    for name, ok, detail in results:
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<18} {detail}")
+    if not all(ok for _, ok, _ in results):
+        raise SystemExit(1)
@@ -0,0 +1,207 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+
+def query_terms_lower(query_terms: List[str]) -> List[str]:
+    """Términos en minúsculas, como los usan filter_relevant_content y extract_key_paragraphs"""
+    return [term.lower() for term in query_terms]
+
+
+class SegmentIndex:
+    """
+    Índice invertido sobre los fragmentos (oraciones o párrafos) de una página.
+
+    Puntúa igual que los filtros originales (un término cuenta si aparece como
+    subcadena, y las apariciones se cuentan sin solaparse dentro de cada
+    fragmento), pero la página se pasa a minúsculas una sola vez. Un término
+    poco frecuente se busca en la página entera (str.find, en C) y cada
+    aparición se asigna a su fragmento buscando los separadores más cercanos,
+    así que solo se construyen los fragmentos que lo contienen. Uno que aparece
+    en muchos fragmentos sale más barato contándolo fragmento a fragmento
+    (str.count, también en C).
+    """
+
+    # Por encima de una aparición por cada tantos fragmentos se cuenta fragmento a fragmento
+    DENSE_RATIO = 4
+
+    def __init__(self, content: str, separators: str, min_length: int = 0):
+        self.content = content
+        self.separators = separators
+        self.min_length = min_length
+        self._lower = content.lower()
+        # Algunos caracteres cambian de longitud al pasar a minúsculas ("İ"); entonces las
+        # posiciones no coinciden y se cuenta fragmento a fragmento
+        self._aligned = len(self._lower) == len(content)
+        self._pieces = sum(content.count(sep) for sep in separators) + 1
+        self._spans: Dict[int, Tuple[int, str]] = {}
+        self._postings: Dict[tuple, Dict[str, Counter]] = {}
+        self._all: Optional[List[Tuple[int, str]]] = None
+        self._lower_segments: Optional[List[Tuple[int, str]]] = None
+
+    def _searchable(self, term: str) -> bool:
+        # Un término vacío o con un separador no se puede buscar en la página entera
+        # (aparecería en todos los fragmentos o cruzaría de uno a otro), y uno que empieza o
+        # acaba en espacio podría coincidir con el espacio que strip() quita del fragmento
+        return bool(term) and term == term.strip() and not any(sep in term for sep in self.separators)
+
+    def _counts_by_occurrence(self, term: str) -> Counter:
+        """Busca el término en la página entera y asigna cada aparición a su fragmento"""
+        text, length = self._lower, len(self._lower)
+        counts = Counter()
+        # Las apariciones (sin solapar) salen en orden, así que cada separador se busca solo
+        # entre el fragmento anterior y la aparición, y su siguiente posición se recuerda
+        following = dict.fromkeys(self.separators, -1)
+        end, start, keep = -1, 0, False
+        position = text.find(term)
+        while position >= 0:
+            if position >= end:
+                start = max(end, *(text.rfind(sep, end + 1, position) for sep in self.separators)) + 1
+                for sep, next_position in following.items():
+                    if next_position < position:
+                        found = text.find(sep, position)
+                        following[sep] = found if found >= 0 else length
+                end = min(following.values())
+                span = self._spans.get(start)
+                if span is None:
+                    span = self._spans[start] = (start, self.content[start:end].strip())
+                keep = len(span[1]) >= self.min_length
+            if keep:
+                counts[start] += 1
+            position = text.find(term, position + len(term))
+        return counts
+
+    def _counts_by_segment(self, term: str) -> Counter:
+        """Cuenta el término fragmento a fragmento, como los filtros originales"""
+        if self._lower_segments is None:
+            self._lower_segments = [(start, segment.lower()) for start, segment in self.all_segments()]
+        return Counter({start: count for start, segment in self._lower_segments if (count := segment.count(term))})
+
+    def postings(self, terms: List[str]) -> Dict[str, Counter]:
+        """término -> {inicio del fragmento: apariciones}"""
+        key = tuple(terms)
+        if key not in self._postings:
+            postings = {}
+            for term in dict.fromkeys(terms):
+                if (self._aligned and self._searchable(term)
+                        and self._lower.count(term) * self.DENSE_RATIO < self._pieces):
+                    counts = self._counts_by_occurrence(term)
+                else:
+                    counts = self._counts_by_segment(term)
+                if counts:
+                    postings[term] = counts
+            self._postings[key] = postings
+        return self._postings[key]
+
+    def segment(self, start: int) -> str:
+        return self._spans[start][1]
+
+    def all_segments(self) -> List[Tuple[int, str]]:
+        """Todos los fragmentos (inicio, texto), en orden"""
+        if self._all is None:
+            pattern = f"[^{re.escape(self.separators)}]+"
+            self._all = [
+                (m.start(), segment) for m in re.finditer(pattern, self.content)
+                if len(segment := m.group().strip()) >= self.min_length
+            ]
+            self._spans.update((span[0], span) for span in self._all)
+        return self._all
+
+    def matched_terms(self, terms: List[str]) -> Dict[int, int]:
+        """Número de términos de la consulta que aparecen en cada fragmento (los repetidos cuentan cada vez)"""
+        matched = Counter()
+        multiplicity = Counter(terms)
+        for term, counts in self.postings(terms).items():
+            for start in counts:
+                matched[start] += multiplicity[term]
+        return matched
+
+    def term_counts(self, terms: List[str]) -> Dict[int, float]:
+        """Apariciones totales de los términos de la consulta en cada fragmento"""
+        scores = Counter()
+        multiplicity = Counter(terms)
+        for term, counts in self.postings(terms).items():
+            for start, count in counts.items():
+                scores[start] += multiplicity[term] * count
+        return scores
+
+    def bm25(self, terms: List[str], k1: float = 1.2, b: float = 0.75) -> Dict[int, float]:
+        segments = self.all_segments()
+        n = len(segments)
+        scores = defaultdict(float)
+        if not n:
+            return scores
+        # Aproximación barata del número de palabras
+        avg_length = sum(segment.count(" ") + 1 for _, segment in segments) / n
+        for counts in self.postings(terms).values():
+            idf = math.log(1 + (n - len(counts) + 0.5) / (len(counts) + 0.5))
+            for start, tf in counts.items():
+                length = self.segment(start).count(" ") + 1
+                norm = k1 * (1 - b + b * length / avg_length)
+                scores[start] += idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+
+class ContentIndex:
+    """
+    Oraciones y párrafos de una página indexados una vez, para reutilizarlos
+    entre filtros y consultas
+    """
+
+    def __init__(self, content: str):
+        self.content = content
+        self._sentences: Optional[SegmentIndex] = None
+        self._paragraphs: Optional[SegmentIndex] = None
+
+    @property
+    def sentences(self) -> SegmentIndex:
+        if self._sentences is None:
+            # Mismo troceado que filter_relevant_content
+            self._sentences = SegmentIndex(self.content, ".!?", min_length=20)
+        return self._sentences
+
+    @property
+    def paragraphs(self) -> SegmentIndex:
+        if self._paragraphs is None:
+            # Mismo troceado que extract_key_paragraphs
+            self._paragraphs = SegmentIndex(self.content, "\n", min_length=51)
+        return self._paragraphs
+
+    def relevant_sentences(self, query_terms: List[str], min_relevance: float = 0.3) -> str:
+        """Equivalente indexado de filter_relevant_content"""
+        terms = query_terms_lower(query_terms)
+        if not terms:
+            return ""
+        index = self.sentences
+        if min_relevance <= 0:
+            # Con relevancia mínima 0 valen todas las oraciones, aunque no tengan ningún término
+            return '. '.join(segment for _, segment in index.all_segments())
+        matched = index.matched_terms(terms)
+        return '. '.join(
+            index.segment(start) for start in sorted(matched) if matched[start] / len(terms) >= min_relevance
+        )
+
+    def key_paragraphs(self, query_terms: List[str], max_paragraphs: int = 5, bm25: bool = False) -> str:
+        """
+        Equivalente indexado de extract_key_paragraphs. Con bm25 las
+        apariciones se ponderan por lo raro que es el término en la página y
+        por la longitud del párrafo
+        """
+        terms = query_terms_lower(query_terms)
+        index = self.paragraphs
+        scores = index.bm25(terms) if bm25 else index.term_counts(terms)
+        # Con las apariciones de algún término se tienen al menos max_paragraphs candidatos;
+        # si no, como en extract_key_paragraphs, se completa con el resto por longitud
+        if not bm25 and len(scores) >= max_paragraphs:
+            candidates = sorted((start, index.segment(start)) for start in scores)
+        else:
+            candidates = index.all_segments()
+        scored = []
+        for start, paragraph in candidates:
+            # Bonus por longitud apropiada (ni muy corto ni muy largo)
+            score = scores.get(start, 0.0) + min(len(paragraph) / 100, 5) * 0.1
+            if score > 0:
+                scored.append((score, paragraph))
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return '\n\n'.join(p for _, p in scored[:max_paragraphs])
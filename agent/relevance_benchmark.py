@@ -0,0 +1,157 @@
+import argparse
+import os
+import random
+import time
+from typing import Callable, Dict, List
+
+from agent.agent_tools import extract_key_paragraphs, extract_main_content, filter_relevant_content
+from agent.relevance import ContentIndex
+
+
+def load_pages(pages_folder: str, max_pages: int) -> List[str]:
+    """Main text of the saved .html pages (sorted by name), extracted once outside the timings."""
+    names = sorted(f for f in os.listdir(pages_folder) if f.lower().endswith((".html", ".htm")))[:max_pages]
+    pages = []
+    for name in names:
+        with open(os.path.join(pages_folder, name), "r", encoding="utf-8", errors="replace") as f:
+            pages.append(extract_main_content(f.read()))
+    return pages
+
+
+def synthetic_page(query_terms: List[str], paragraphs: int = 2000, seed: int = 0) -> str:
+    """Large page of random text with the query terms sprinkled in, for machines without saved pages."""
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(5000)] + [term.lower() for term in query_terms]
+    lines = []
+    for _ in range(paragraphs):
+        sentences = [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(6, 20))) for _ in range(rng.randint(2, 6))]
+        lines.append(". ".join(sentences) + ".")
+    return "\n".join(lines)
+
+
+# Frases de reseñas reales (plurales, tildes, mayúsculas, abreviaturas con punto...) para la
+# comprobación de equivalencia; con páginas de "wordN" no se ven las diferencias de subcadenas
+REALISTIC_SENTENCES = [
+    "Barcelona reviews are mixed, but most visitors love the Sagrada Família",
+    "The SAGRADA FAMILIA was reviewed by over 200,000 tourists last year!",
+    "Tickets for the basilica sell out quickly in summer, so book online",
+    "Is it worth the queue? Most reviewers say yes",
+    "Bar Pepe, in Madrid's La Latina, serves the best croquetas in town",
+    "Our review of Bar Pepe: friendly staff, small portions and high prices",
+    "St. Louis has a different cathedral that some U.S. reviewers compare it to",
+    "La reseña del café en İstanbul menciona la basílica de Barcelona",
+    "Parking nearby is expensive and the metro (line L2) is faster",
+    "Pepe's tapas, Pepe's wine and Pepe's terrace all get good reviews",
+    "Gaudí started the project in 1883 and it is still not finished",
+    "Review review review: the word appears three times in this sentence",
+]
+
+REALISTIC_QUERIES = [
+    "Sagrada Familia Barcelona review",
+    "Bar Pepe review",
+    "review",
+    "Pepe Pepe Madrid",
+    "U.S. review",
+    "St. Louis",
+    "café İstanbul",
+]
+
+
+def realistic_page(paragraphs: int = 300, seed: int = 0) -> str:
+    """Page built from REALISTIC_SENTENCES, with varied punctuation and paragraph lengths."""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(paragraphs):
+        sentences = [rng.choice(REALISTIC_SENTENCES) for _ in range(rng.randint(1, 5))]
+        lines.append(" ".join(sentence + rng.choice([".", "!", "?", "...", ". "]) for sentence in sentences))
+    return "\n".join(lines)
+
+
+def check_parity(pages: List[str], queries: List[str]) -> List[str]:
+    """The index engine must give exactly the scan engine's output. Returns the mismatches."""
+    mismatches = []
+    for query in queries:
+        query_terms = query.split()
+        for i, page in enumerate(pages):
+            if _scan(page, query_terms) != _index(page, query_terms):
+                mismatches.append(f"page {i}, query {query!r}")
+    return mismatches
+
+
+def _scan(content: str, query_terms: List[str]):
+    return filter_relevant_content(content, query_terms), extract_key_paragraphs(content, query_terms)
+
+
+def _index(content: str, query_terms: List[str], bm25: bool = False):
+    index = ContentIndex(content)
+    return index.relevant_sentences(query_terms), index.key_paragraphs(query_terms, bm25=bm25)
+
+
+ENGINES: Dict[str, Callable] = {
+    "scan": _scan,
+    "index": _index,
+    "bm25": lambda content, query_terms: _index(content, query_terms, bm25=True),
+}
+
+
+def run_benchmark(pages: List[str], query_terms: List[str], engines: List[str], repeat: int = 5) -> List[Dict]:
+    results = []
+    for name in engines:
+        engine = ENGINES[name]
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outputs = [engine(page, query_terms) for page in pages]
+            best = min(best, time.perf_counter() - start)
+        results.append({
+            "engine": name,
+            "ms_per_page": best / len(pages) * 1000,
+            "sentence_chars": sum(len(sentences) for sentences, _ in outputs),
+        })
+    return results
+
+
+def print_results(results: List[Dict], pages: List[str]):
+    baseline = next((r["ms_per_page"] for r in results if r["engine"] == "scan"), None)
+    print(f"\n{len(pages)} pages, {sum(len(p) for p in pages) / len(pages) / 1024:.0f} KB of text per page on average")
+    print(f"{'engine':<8} {'ms/page':>10} {'speedup':>8} {'sentence chars':>15}")
+    for r in results:
+        speedup = f"{baseline / r['ms_per_page']:.1f}x" if baseline else "-"
+        print(f"{r['engine']:<8} {r['ms_per_page']:>10.2f} {speedup:>8} {r['sentence_chars']:>15}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Speed of the content relevance filters on large pages.")
+    parser.add_argument("--pages", help="Folder with saved .html pages", default="./benchmark_pages")
+    parser.add_argument("--max-pages", help="Number of pages (sorted by name) to use", type=int, default=20)
+    parser.add_argument("--query", help="Query whose terms are scored", default="Sagrada Familia Barcelona review")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument("--repeat", help="Runs per engine (the best one is reported)", type=int, default=5)
+    parser.add_argument("--synthetic", help="Use N generated pages instead of --pages", type=int, default=0)
+    parser.add_argument("--check", help="Only check that the index engine gives the same output as the scan "
+                        "engine, on realistic generated pages and on --pages if there are any", action="store_true")
+    args = parser.parse_args()
+
+    query_terms = args.query.split()
+    if args.check:
+        pages = [realistic_page(seed=i) for i in range(5)]
+        # "İ" cambia de longitud al pasar a minúsculas y lleva al camino fragmento a fragmento;
+        # sin él se comprueba el camino indexado
+        pages += [page.replace("İ", "I") for page in pages]
+        if os.path.isdir(args.pages):
+            pages += load_pages(args.pages, args.max_pages)
+        mismatches = check_parity(pages, REALISTIC_QUERIES + [args.query])
+        for mismatch in mismatches:
+            print(f"Different output: {mismatch}")
+        print(f"{len(pages)} pages, {len(REALISTIC_QUERIES) + 1} queries: "
+              f"{'same output' if not mismatches else f'{len(mismatches)} mismatches'}")
+        raise SystemExit(1 if mismatches else 0)
+
+    if args.synthetic:
+        pages = [synthetic_page(query_terms, seed=i) for i in range(args.synthetic)]
+    else:
+        pages = load_pages(args.pages, args.max_pages)
+    if not pages:
+        raise SystemExit(f"No pages found in {args.pages}")
+
+    print_results(run_benchmark(pages, query_terms, args.engines, args.repeat), pages)
@@ -0,0 +1,116 @@
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class SearxngClient:
+    """
+    Cliente de SearXNG con conexiones persistentes, timeouts y reintentos.
+
+    - Una sesión con pool de conexiones keep-alive compartida entre hilos.
+    - Reintenta errores de conexión, timeouts y respuestas 429/5xx con
+      espera exponencial y jitter aleatorio.
+    - Si llega una consulta idéntica a otra que está en curso, espera a su
+      resultado en lugar de repetir la petición. El limitador de concurrencia
+      (si se pasa) solo lo ocupa quien hace la petición, no quien espera.
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8080", num_results: int = 7, pool_size: int = 16,
+                 connect_timeout: float = 3, read_timeout: float = 15, retries: int = 3,
+                 backoff: float = 0.5, max_backoff: float = 8):
+        self.url = base_url.rstrip("/") + "/search"
+        self.num_results = num_results
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": "Mozilla/5.0", "Accept": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.requests = 0
+        self.retried = 0
+        self.coalesced = 0
+
+    def _request(self, query: str) -> Dict:
+        params = {"q": query, "format": "json", "num": self.num_results}
+        for attempt in range(self.retries + 1):
+            try:
+                with self._lock:
+                    self.requests += 1
+                r = self.session.get(self.url, params=params, timeout=self.timeout)
+                if r.status_code not in RETRY_STATUS:
+                    r.raise_for_status()
+                    return r.json()
+                error = requests.HTTPError(f"{r.status_code} de SearXNG para {query!r}", response=r)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt == self.retries:
+                raise error
+            # Espera exponencial con jitter completo para no sincronizar los reintentos
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            print(f"Reintentando búsqueda {query!r} en {delay:.1f} s ({error})")
+            with self._lock:
+                self.retried += 1
+            time.sleep(delay)
+
+    def search(self, query: str, limiter=None) -> Dict:
+        with self._lock:
+            future = self._in_flight.get(query)
+            owner = future is None
+            if owner:
+                future = self._in_flight[query] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+
+        try:
+            with limiter if limiter is not None else nullcontext():
+                result = self._request(query)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[query]
+
+    def search_many(self, queries: List[str], max_workers: Optional[int] = None) -> List[Optional[Dict]]:
+        """
+        Lanza varias consultas a la vez y devuelve los resultados en el mismo
+        orden (None si una falla tras los reintentos)
+        """
+        unique = list(dict.fromkeys(queries))
+        if not unique:
+            return []
+
+        def safe_search(query):
+            try:
+                return self.search(query)
+            except Exception as e:
+                print(f"Error buscando {query!r}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(max_workers or len(unique), len(unique))) as executor:
+            results = dict(zip(unique, executor.map(safe_search, unique)))
+        return [results[query] for query in queries]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"requests": self.requests, "retried": self.retried, "coalesced": self.coalesced}
+
+    def close(self):
+        self.session.close()
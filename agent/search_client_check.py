@@ -0,0 +1,205 @@
+import argparse
+import json
+import threading
+import time
+import types
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from agent import search_client
+from agent.search_client import SearxngClient
+
+SLOW_DELAY = 0.5
+
+
+class StandInServer:
+    """
+    Local stand-in for SearXNG's /search endpoint. The query decides the behaviour:
+    "slow ..." answers after SLOW_DELAY, "flaky ..." fails with 503 on its first
+    request, "hang ..." never answers in time, "broken ..." always fails with 500,
+    and "delay=<seconds> ..." answers after that many seconds.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, payload, status: int = 200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up first (timeout check)
+                    pass
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path != "/search":
+                    self.send_json({"error": "not found"}, status=404)
+                    return
+                query = parse_qs(parts.query).get("q", [""])[0]
+                with server.lock:
+                    server.requests[query] += 1
+                    count = server.requests[query]
+                if query.startswith("slow"):
+                    time.sleep(SLOW_DELAY)
+                elif query.startswith("flaky") and count == 1:
+                    self.send_json({"error": "unavailable"}, status=503)
+                    return
+                elif query.startswith("hang"):
+                    time.sleep(2)
+                elif query.startswith("broken"):
+                    self.send_json({"error": "internal"}, status=500)
+                    return
+                elif query.startswith("delay="):
+                    time.sleep(float(query.split()[0].split("=", 1)[1]))
+                self.send_json({"query": query, "results": [
+                    {"title": f"{query} result", "url": "https://example.com/", "content": f"About {query}"}
+                ]})
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def check_coalescing(server: StandInServer, callers: int) -> str:
+    client = SearxngClient(server.base_url, retries=0)
+    results = [None] * callers
+
+    def search(i):
+        results[i] = client.search("slow bar pepe")
+
+    threads = [threading.Thread(target=search, args=(i,)) for i in range(callers)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        client.close()
+    assert all(result and result["query"] == "slow bar pepe" for result in results), "some callers got no result"
+    upstream = server.requests["slow bar pepe"]
+    assert upstream == 1, f"{callers} identical queries made {upstream} upstream requests"
+    assert client.stats()["coalesced"] == callers - 1, f"coalesced: {client.stats()['coalesced']}"
+    return f"{callers} concurrent identical queries, {upstream} upstream request"
+
+
+def check_retry_5xx(server: StandInServer) -> str:
+    client = SearxngClient(server.base_url, retries=2, backoff=0.05, max_backoff=0.1)
+    try:
+        result = client.search("flaky bar pepe")
+    finally:
+        client.close()
+    assert result["query"] == "flaky bar pepe", "wrong result after the retry"
+    assert server.requests["flaky bar pepe"] == 2, f"{server.requests['flaky bar pepe']} requests for 503 + 200"
+    assert client.stats()["retried"] == 1, f"retried: {client.stats()['retried']}"
+    return "503 then 200: succeeded after 1 retry"
+
+
+def check_timeout(server: StandInServer) -> str:
+    client = SearxngClient(server.base_url, read_timeout=0.3, retries=1, backoff=0.05, max_backoff=0.1)
+    start = time.perf_counter()
+    try:
+        client.search("hang bar pepe")
+    except requests.Timeout:
+        pass
+    else:
+        raise AssertionError("a query that never answers did not raise a timeout")
+    finally:
+        client.close()
+    elapsed = time.perf_counter() - start
+    assert server.requests["hang bar pepe"] == 2, f"{server.requests['hang bar pepe']} requests for 1 retry"
+    assert elapsed < 1.5, f"gave up after {elapsed:.1f} s"
+    return f"timed out, retried once and raised after {elapsed:.2f} s"
+
+
+def check_jitter(server: StandInServer, retries: int = 4, backoff: float = 0.2, max_backoff: float = 0.5) -> str:
+    client = SearxngClient(server.base_url, retries=retries, backoff=backoff, max_backoff=max_backoff)
+    delays = []
+    # Only the client module's view of time.sleep is replaced, so no real waiting happens
+    real_time = search_client.time
+    search_client.time = types.SimpleNamespace(sleep=delays.append)
+    try:
+        client.search("broken bar pepe")
+    except requests.HTTPError:
+        pass
+    else:
+        raise AssertionError("a query that always fails did not raise")
+    finally:
+        search_client.time = real_time
+        client.close()
+    assert len(delays) == retries, f"{len(delays)} waits for {retries} retries"
+    for attempt, delay in enumerate(delays):
+        bound = min(max_backoff, backoff * 2 ** attempt)
+        assert 0 <= delay <= bound, f"wait {delay:.3f} s on attempt {attempt} outside [0, {bound}]"
+    return "waits within [0, min(max_backoff, backoff * 2^attempt)]: " + ", ".join(f"{d:.2f}" for d in delays)
+
+
+def check_search_many(server: StandInServer) -> str:
+    client = SearxngClient(server.base_url, retries=0)
+    # The first queries answer last, so completion order is the reverse of input order
+    queries = ["delay=0.3 a", "delay=0.2 b", "broken c", "delay=0.1 d", "delay=0.3 a"]
+    try:
+        results = client.search_many(queries)
+    finally:
+        client.close()
+    expected = [None if query.startswith("broken") else query for query in queries]
+    got = [result and result["query"] for result in results]
+    assert got == expected, f"results out of order: {got}"
+    assert server.requests["delay=0.3 a"] == 1, "repeated query requested twice"
+    return f"{len(queries)} queries in input order, failed one as None, repeated one requested once"
+
+
+def run_checks(callers: int) -> List[Tuple[str, bool, str]]:
+    checks: List[Tuple[str, Callable]] = [
+        ("coalescing", lambda server: check_coalescing(server, callers)),
+        ("retry on 5xx", check_retry_5xx),
+        ("timeout", check_timeout),
+        ("backoff jitter", check_jitter),
+        ("search_many order", check_search_many),
+    ]
+    results = []
+    for name, check in checks:
+        # A fresh server per check, so request counts do not leak between them
+        with StandInServer() as server:
+            try:
+                results.append((name, True, check(server)))
+            except AssertionError as e:
+                results.append((name, False, str(e)))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check SearxngClient against a local SearXNG stand-in server.")
+    parser.add_argument("--callers", help="Concurrent identical queries in the coalescing check", type=int, default=8)
+    args = parser.parse_args()
+
+    results = run_checks(args.callers)
+    for name, ok, detail in results:
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<18} {detail}")
+    if not all(ok for _, ok, _ in results):
+        raise SystemExit(1)
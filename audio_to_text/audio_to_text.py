@@ -1,30 +1,83 @@
 import os
 import argparse
-import whisper
+from typing import Dict, List, Optional
 
-def transcribe_videos(input_folder: str, output_folder: str, model_name: str = "base"):
-    # Load Whisper model
-    print(f"Loading Whisper model: {model_name}")
-    model = whisper.load_model(model_name)
+from audio_to_text.transcription_engine import TranscriptionEngine, is_up_to_date
+from audio_to_text.transcript_cache import TranscriptCache, file_sha256
+
+def transcribe_videos(input_folder: str, output_folder: str, model_name: str = "base", filenames: Optional[List[str]] = None,
+                      decode_workers: int = 2, inference_workers: int = 1, skip_existing: bool = True,
+                      backend: str = "whisper", vad: bool = False, cache_path: Optional[str] = None,
+                      cache_max_mb: int = 256) -> Dict[str, dict]:
+    """
+    Transcribe the videos of input_folder (or only `filenames`, if given).
+    Returns {filename: {"no_speech": bool or None}} for every video whose
+    transcript is up to date after the call (None if it was already transcribed).
+
+    With `cache_path`, transcripts are looked up by video content hash before
+    decoding anything, and the model is only loaded if some video misses.
+    """
+    if filenames is None:
+        filenames = os.listdir(input_folder)
 
     # Ensure output folder exists
     os.makedirs(output_folder, exist_ok=True)
 
-    # Supported video formats
-
-    for filename in os.listdir(input_folder):
+    up_to_date = {}
+    jobs = {}
+    for filename in filenames:
         video_path = os.path.join(input_folder, filename)
         output_path = os.path.join(
             output_folder, os.path.splitext(filename)[0] + ".txt"
         )
+        if not os.path.exists(video_path):
+            print(f"Video not found, skipping: {video_path}")
+            continue
+        if skip_existing and is_up_to_date(video_path, output_path):
+            up_to_date[filename] = {"no_speech": None}
+            continue
+        jobs[video_path] = filename
+
+    print(f"Videos to transcribe: {len(jobs)} ({len(up_to_date)} already transcribed)")
+
+    cache = TranscriptCache(cache_path, max_mb=cache_max_mb) if cache_path else None
+    cache_keys = {}
+    if cache is not None:
+        for video_path in list(jobs):
+            key = TranscriptCache.key(file_sha256(video_path), backend, model_name, vad)
+            cached = cache.get(key)
+            if cached is None:
+                cache_keys[video_path] = key
+                continue
+            filename = jobs.pop(video_path)
+            output_path = os.path.join(output_folder, os.path.splitext(filename)[0] + ".txt")
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(cached["text"])
+            print(f"Transcript reused from cache: {output_path}")
+            up_to_date[filename] = {"no_speech": cached["no_speech"]}
 
-        print(f"Transcribing: {video_path}")
-        result = model.transcribe(video_path)
+    if not jobs:
+        if cache is not None:
+            cache.print_stats()
+        return up_to_date
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(result["text"])
+    engine = TranscriptionEngine(model_name, decode_workers=decode_workers, inference_workers=inference_workers,
+                                 backend=backend, vad=vad)
+    done = engine.transcribe([
+        (video_path, os.path.join(output_folder, os.path.splitext(filename)[0] + ".txt"))
+        for video_path, filename in jobs.items()
+    ])
+    for video_path, info in done.items():
+        filename = jobs[video_path]
+        up_to_date[filename] = info
+        if cache is not None:
+            output_path = os.path.join(output_folder, os.path.splitext(filename)[0] + ".txt")
+            with open(output_path, "r", encoding="utf-8") as f:
+                cache.set(cache_keys[video_path], f.read(), info["no_speech"])
 
-        print(f"Saved transcription to: {output_path}")
+    if cache is not None:
+        cache.print_stats()
+    return up_to_date
 
 
 if __name__ == "__main__":
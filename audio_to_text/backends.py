@@ -0,0 +1,110 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Type
+
+SAMPLE_RATE = 16000
+
+
+class TranscriptionBackend(ABC):
+    """
+    Speech-to-text backend used by the transcription engine.
+
+    Subclasses load a model once and transcribe 16 kHz mono float32 arrays.
+    """
+
+    name = None
+
+    def __init__(self, model_name: str, num_threads: int = 0):
+        self.model_name = model_name
+        self.num_threads = num_threads
+        self.model = None
+
+    @staticmethod
+    @abstractmethod
+    def decode(video_path: str):
+        """Decode a video's audio track to a 16 kHz mono float32 array."""
+
+    @abstractmethod
+    def load(self):
+        """Load the model and return self."""
+
+    @abstractmethod
+    def transcribe(self, audio) -> str:
+        """Transcribe a decoded audio array."""
+
+
+class WhisperBackend(TranscriptionBackend):
+    """openai-whisper (PyTorch)."""
+
+    name = "whisper"
+
+    @staticmethod
+    def decode(video_path: str):
+        import whisper
+        return whisper.load_audio(video_path, sr=SAMPLE_RATE)
+
+    def load(self):
+        import torch
+        import whisper
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        print(f"Loading Whisper model: {self.model_name}")
+        self.model = whisper.load_model(self.model_name)
+        return self
+
+    def transcribe(self, audio) -> str:
+        result = self.model.transcribe(audio, fp16=self.model.device.type == "cuda")
+        return result["text"]
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """faster-whisper (CTranslate2) with int8 weights on CPU."""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_name: str, num_threads: int = 0, compute_type: str = "int8"):
+        super().__init__(model_name, num_threads)
+        self.compute_type = compute_type
+
+    @staticmethod
+    def decode(video_path: str):
+        from faster_whisper import decode_audio
+        return decode_audio(video_path, sampling_rate=SAMPLE_RATE)
+
+    def load(self):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise ImportError("faster-whisper is not installed. Install it with: pip install faster-whisper")
+        print(f"Loading faster-whisper model: {self.model_name} ({self.compute_type})")
+        self.model = WhisperModel(
+            self.model_name, device="cpu", compute_type=self.compute_type, cpu_threads=self.num_threads
+        )
+        return self
+
+    def transcribe(self, audio) -> str:
+        segments, _ = self.model.transcribe(audio)
+        return "".join(segment.text for segment in segments)
+
+
+BACKENDS: Dict[str, Type[TranscriptionBackend]] = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def get_backend(name: str) -> Type[TranscriptionBackend]:
+    if name not in BACKENDS:
+        raise ValueError(f"Invalid transcription backend. Possible values: {list(BACKENDS)}")
+    return BACKENDS[name]
+
+
+def decode_audio(backend_name: str, video_path: str, vad: bool = False):
+    """
+    Module-level entry point so audio decoding (and the optional VAD pre-pass)
+    can run in a process pool. Returns (audio, vad_info); vad_info is None without VAD.
+    """
+    audio = get_backend(backend_name).decode(video_path)
+    if not vad:
+        return audio, None
+    from audio_to_text.vad import keep_speech
+    return keep_speech(audio)
@@ -0,0 +1,132 @@
+import os
+import argparse
+import multiprocessing
+import queue as queue_module
+import time
+from typing import Dict, List, Optional
+
+from audio_to_text.backends import BACKENDS, SAMPLE_RATE, get_backend
+
+VIDEO_EXTENSIONS = (".mp4", ".m4a", ".mp3", ".wav", ".webm")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of the current process in MB."""
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in KB on Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def sample_clips(clips_folder: str, max_clips: int) -> List[str]:
+    """Fixed, sorted selection of clips so every run measures the same audio."""
+    clips = sorted(
+        f for f in os.listdir(clips_folder) if f.lower().endswith(VIDEO_EXTENSIONS)
+    )[:max_clips]
+    return [os.path.join(clips_folder, f) for f in clips]
+
+
+def _run_case(backend_name: str, model_name: str, clips: List[str], num_threads: int, queue):
+    # Runs in its own process so peak RSS is measured per backend and model
+    try:
+        backend_class = get_backend(backend_name)
+        audios = [backend_class.decode(clip) for clip in clips]
+        audio_seconds = sum(len(audio) for audio in audios) / SAMPLE_RATE
+
+        start = time.perf_counter()
+        backend = backend_class(model_name, num_threads=num_threads).load()
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for audio in audios:
+            backend.transcribe(audio)
+        inference_seconds = time.perf_counter() - start
+
+        queue.put({
+            "backend": backend_name,
+            "model": model_name,
+            "clips": len(clips),
+            "audio_seconds": audio_seconds,
+            "load_seconds": load_seconds,
+            "inference_seconds": inference_seconds,
+            "rtf": inference_seconds / audio_seconds if audio_seconds else None,
+            "peak_rss_mb": peak_rss_mb(),
+        })
+    except Exception as e:
+        queue.put({"backend": backend_name, "model": model_name, "error": str(e)})
+
+
+def run_benchmark(clips: List[str], backends: List[str], models: List[str], num_threads: int = 0) -> List[Dict]:
+    """Benchmark every backend/model combination on the same clips."""
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for backend_name in backends:
+        for model_name in models:
+            print(f"Benchmarking {backend_name} / {model_name}...")
+            queue = context.Queue()
+            process = context.Process(
+                target=_run_case, args=(backend_name, model_name, clips, num_threads, queue)
+            )
+            process.start()
+            results.append(_wait_for_result(process, queue, backend_name, model_name))
+    return results
+
+
+def _wait_for_result(process, queue, backend_name: str, model_name: str, poll_seconds: float = 5) -> Dict:
+    """Result of a benchmark process, or an error if it dies without one (OOM kill, segfault...)."""
+    while True:
+        try:
+            result = queue.get(timeout=poll_seconds)
+            break
+        except queue_module.Empty:
+            if process.is_alive():
+                continue
+            # The child may have put its result just before exiting
+            try:
+                result = queue.get(timeout=1)
+            except queue_module.Empty:
+                result = {"backend": backend_name, "model": model_name,
+                          "error": f"process exited with code {process.exitcode} without a result"}
+            break
+    process.join()
+    return result
+
+
+def print_results(results: List[Dict]):
+    print(f"\n{'backend':<16}{'model':<12}{'RTF':>8}{'load s':>10}{'infer s':>10}{'peak RSS MB':>14}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:<16}{r['model']:<12}  error: {r['error']}")
+            continue
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/a"
+        # No RTF when the clips have no measurable audio
+        rtf = f"{r['rtf']:.3f}" if r["rtf"] is not None else "n/a"
+        print(f"{r['backend']:<16}{r['model']:<12}{rtf:>8}{r['load_seconds']:>10.1f}"
+              f"{r['inference_seconds']:>10.1f}{rss:>14}")
+    print("\nRTF = inference time / audio duration (lower is faster)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Real-time factor and peak memory of each transcription backend.")
+    parser.add_argument("--clips", help="Folder with the sample clips", default="./benchmark_clips")
+    parser.add_argument("--max-clips", help="Number of clips (sorted by name) to use", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--models", nargs="+", default=["tiny", "base", "small"])
+    parser.add_argument("--threads", help="CPU threads per backend (0 = library default)", type=int, default=0)
+    args = parser.parse_args()
+
+    clips = sample_clips(args.clips, args.max_clips)
+    if not clips:
+        raise SystemExit(f"No clips found in {args.clips}")
+    print(f"Using {len(clips)} clips from {args.clips}")
+    print_results(run_benchmark(clips, args.backends, args.models, args.threads))
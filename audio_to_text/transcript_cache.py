@@ -0,0 +1,40 @@
+import hashlib
+from typing import Optional
+
+from pipeline.disk_cache import DiskLRUCache
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TranscriptCache:
+    """
+    Content-addressed transcript cache shared across collections.
+
+    Entries are keyed by the SHA-256 of the video bytes plus everything that
+    changes the output (backend, model and VAD), so the same video scraped
+    from another collection reuses its transcript.
+    """
+
+    def __init__(self, path: str, max_mb: int = 256):
+        self.store = DiskLRUCache(path, max_bytes=max_mb * 1024 * 1024)
+
+    @staticmethod
+    def key(content_hash: str, backend: str, model_name: str, vad: bool) -> str:
+        return f"{backend}:{model_name}:vad={int(vad)}:{content_hash}"
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.store.get(key)
+
+    def set(self, key: str, text: str, no_speech: bool):
+        self.store.set(key, {"text": text, "no_speech": no_speech})
+
+    def print_stats(self):
+        stats = self.store.stats()
+        print(f"Transcript cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries ({stats['bytes'] / (1024 * 1024):.1f} MB)")
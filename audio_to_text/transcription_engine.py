@@ -0,0 +1,145 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from audio_to_text.backends import decode_audio, get_backend
+
+
+def is_up_to_date(video_path: str, transcript_path: str) -> bool:
+    """True if the transcript exists and is newer than the video."""
+    return (
+        os.path.exists(transcript_path)
+        and os.path.getmtime(transcript_path) >= os.path.getmtime(video_path)
+    )
+
+
+class TranscriptionEngine:
+    """
+    Transcribes many videos reusing the loaded models.
+
+    Audio is decoded in a process pool, `prefetch` files ahead of inference,
+    so decoding the next files overlaps with the model working on the current
+    ones. `inference_workers` threads run the model, each with its own backend
+    instance; both backends release the GIL during inference.
+
+    With `vad=True` only the speech regions are sent to the model, and clips
+    without speech (silence, music only) get an empty transcript and the
+    no_speech flag without running inference.
+    """
+
+    def __init__(self, model_name: str = "base", decode_workers: int = 2, inference_workers: int = 1,
+                 prefetch: Optional[int] = None, backend: str = "whisper", vad: bool = False):
+        self.model_name = model_name
+        self.backend_name = backend
+        self.backend_class = get_backend(backend)
+        self.decode_workers = max(1, decode_workers)
+        self.inference_workers = max(1, inference_workers)
+        self.prefetch = prefetch or self.decode_workers * 2
+        self.vad = vad
+        self._local = threading.local()
+        self._models_lock = threading.Lock()
+
+    def _model(self):
+        # One model per inference thread, loaded on first use
+        model = getattr(self._local, "model", None)
+        if model is None:
+            # Split the CPU cores between the inference workers
+            num_threads = max(1, (os.cpu_count() or 1) // self.inference_workers)
+            with self._models_lock:
+                model = self.backend_class(self.model_name, num_threads=num_threads).load()
+            self._local.model = model
+        return model
+
+    def _infer(self, video_path: str, output_path: str, audio) -> bool:
+        try:
+            text = self._model().transcribe(audio)
+        except Exception as e:
+            print(f"Error transcribing {video_path}: {e}")
+            return False
+
+        self._write(output_path, text)
+        return True
+
+    @staticmethod
+    def _write(output_path: str, text: str):
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Saved transcription to: {output_path}")
+
+    def transcribe_decoded(self, video_path: str, output_path: str, audio, vad_info: Optional[dict]) -> Optional[dict]:
+        """
+        Transcribe audio already decoded with `decode_audio` (e.g. by a separate
+        decoding stage), in the calling thread. The model is loaded once per calling
+        thread. Returns {"no_speech": bool}, or None on error.
+        """
+        if vad_info is not None and vad_info["no_speech"]:
+            print(f"No speech detected, skipping inference: {video_path}")
+            self._write(output_path, "")
+            return {"no_speech": True}
+
+        print(f"Transcribing: {video_path}")
+        if not self._infer(video_path, output_path, audio):
+            return None
+        return {"no_speech": False}
+
+    def transcribe(self, jobs: List[Tuple[str, str]]) -> Dict[str, dict]:
+        """
+        Transcribe a list of (video_path, output_path) pairs.
+        Returns {video_path: {"no_speech": bool}} for the transcripts written.
+        """
+        if not jobs:
+            return {}
+
+        done = {}
+        audio_seconds = speech_seconds = 0.0
+        # Bounds the decoded audio waiting for the model
+        slots = threading.BoundedSemaphore(self.inference_workers * 2)
+
+        with ProcessPoolExecutor(self.decode_workers) as decoders, \
+                ThreadPoolExecutor(self.inference_workers) as inferers:
+            remaining = iter(jobs)
+            decoding = deque()
+
+            def submit_next_decode():
+                job = next(remaining, None)
+                if job is not None:
+                    decoding.append((job, decoders.submit(decode_audio, self.backend_name, job[0], self.vad)))
+
+            for _ in range(self.prefetch):
+                submit_next_decode()
+
+            inference_futures = []
+            while decoding:
+                (video_path, output_path), decoded = decoding.popleft()
+                submit_next_decode()
+                try:
+                    audio, vad_info = decoded.result()
+                except Exception as e:
+                    print(f"Error decoding audio from {video_path}: {e}")
+                    continue
+
+                if vad_info is not None:
+                    audio_seconds += vad_info["audio_seconds"]
+                    speech_seconds += vad_info["speech_seconds"]
+                    if vad_info["no_speech"]:
+                        print(f"No speech detected, skipping inference: {video_path}")
+                        self._write(output_path, "")
+                        done[video_path] = {"no_speech": True}
+                        continue
+
+                print(f"Transcribing: {video_path}")
+                slots.acquire()
+                future = inferers.submit(self._infer, video_path, output_path, audio)
+                future.add_done_callback(lambda _: slots.release())
+                inference_futures.append((video_path, future))
+
+            for video_path, future in inference_futures:
+                if future.result():
+                    done[video_path] = {"no_speech": False}
+
+        if self.vad and audio_seconds:
+            print(f"VAD: {speech_seconds:.0f} s of speech out of {audio_seconds:.0f} s of audio "
+                  f"({speech_seconds / audio_seconds:.0%} sent to the model)")
+        return done
@@ -0,0 +1,38 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from audio_to_text.backends import SAMPLE_RATE
+
+
+def speech_regions(audio: np.ndarray, threshold: float = 0.5, min_silence_ms: int = 500,
+                   speech_pad_ms: int = 200) -> List[Tuple[int, int]]:
+    """
+    Find speech regions with the Silero VAD model bundled in faster-whisper.
+    Returns (start, end) sample offsets.
+    """
+    try:
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+    except ImportError:
+        raise ImportError("The VAD pre-pass needs faster-whisper. Install it with: pip install faster-whisper")
+
+    options = VadOptions(threshold=threshold, min_silence_duration_ms=min_silence_ms, speech_pad_ms=speech_pad_ms)
+    return [(region["start"], region["end"]) for region in get_speech_timestamps(audio, options)]
+
+
+def keep_speech(audio: np.ndarray, min_speech_seconds: float = 1.0, **vad_options) -> Tuple[np.ndarray, dict]:
+    """
+    Keep only the speech regions of `audio`, concatenated.
+    If there is less than `min_speech_seconds` of speech the returned audio is
+    empty and the info dict is flagged with no_speech=True.
+    """
+    regions = speech_regions(audio, **vad_options)
+    speech_samples = sum(end - start for start, end in regions)
+    info = {
+        "audio_seconds": len(audio) / SAMPLE_RATE,
+        "speech_seconds": speech_samples / SAMPLE_RATE,
+        "no_speech": speech_samples / SAMPLE_RATE < min_speech_seconds,
+    }
+    if info["no_speech"]:
+        return audio[:0], info
+    return np.concatenate([audio[start:end] for start, end in regions]), info
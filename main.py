@@ -1,13 +1,24 @@
 import json
 import argparse
+import asyncio
 import os
 import pandas as pd
 
 from collections import defaultdict
 from tiktok_scraping.tiktok_collection_scraper import TikTokCollectionScraper
-from tiktok_scraping.tiktok_video_scraper import TikTokVideoScraper
+from tiktok_scraping.video_ingestion_pool import VideoIngestionPool
+from tiktok_scraping.browser_pool import BrowserPool
 from audio_to_text.audio_to_text import transcribe_videos
-from agent.agent import app
+from audio_to_text.backends import BACKENDS
+from agent.agent import (
+    configure_concurrency, configure_entity_cache, configure_context_budget, configure_full_pages, close_page_fetcher,
+    SEARCH_CONCURRENCY, LLM_CONCURRENCY, ENTITY_CACHE_TTL_DAYS, WEB_CONTEXT_TOKENS, TOKENIZER_URL, FULL_PAGES, FULL_PAGE_URLS
+)
+from agent.batch_driver import run_agent_batch
+from agent.entity_index import EntityIndex
+from agent.output_parsing import OutputParsingError, parse_summaries
+from pipeline.state_store import PipelineStateStore
+from pipeline.streaming import run_video_pipeline
 
 # Config
 COLLECTION_URL = "https://vm.tiktok.com/ZNHWssk5wSBYk-PnpGF/"
@@ -15,23 +26,65 @@ COLLECTION_URL = "https://vm.tiktok.com/ZNHWssk5wSBYk-PnpGF/"
 # Url collection scraper
 COLLECTION_URL_FILE = "tiktok_urls.json"
 
+# Estado del pipeline por video (permite reanudar y procesar solo lo nuevo)
+STATE_DB = "./pipeline_state.db"
+DATA_FOLDER = "./data"
+
+# Video download
+BROWSER_WORKERS = 2  # Navegadores Chrome en paralelo
+DOWNLOAD_WORKERS = 4  # Descargas yt-dlp en paralelo
+BROWSER_MAX_PAGES = 200  # Páginas que abre un Chrome antes de reciclarlo
+BROWSER_MAX_MEMORY_MB = 1500  # Se recicla si Chrome supera esta memoria (requiere psutil)
+LEAN_BROWSER = True  # Chrome sin imágenes, fuentes ni video y sin esperar a la carga completa
+
 # Video transcriptions
 VIDEOS_FOLDER = "./downloads"
 TRANSCRIPTS_FOLDER = "./transcripts"
 WHISPER_MODEL = "turbo"  # tiny, base, small, medium, large, large-v2, large-v3, turbo
+TRANSCRIPTION_BACKEND = "whisper"  # whisper (openai-whisper) o faster-whisper (CTranslate2 int8, más rápido en CPU)
+DECODE_WORKERS = 2  # Procesos ffmpeg decodificando audio mientras el modelo transcribe
+INFERENCE_WORKERS = 1  # Instancias del modelo transcribiendo en paralelo (CPU)
+USE_VAD = False  # Transcribir solo los tramos con voz (requiere faster-whisper)
+TRANSCRIPT_CACHE = "./cache/transcripts.db"  # Caché por contenido del video, compartida entre colecciones
+TRANSCRIPT_CACHE_MB = 256
 
 # Agent
 RESULT_FOLDER = "./results"
+AGENT_CONCURRENCY = 4  # Videos procesados a la vez por el agente
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Example script with arguments.")
     
     parser.add_argument("--url", help="Url of the TikTok collection", default=COLLECTION_URL)
     parser.add_argument("--first-step", help="First step to do. Possible values:\n-download-url\n-download-videos\n-transcript\n-agent", default="download-url")
+    parser.add_argument("--browser-workers", help="Number of Chrome workers for the download-videos step", type=int, default=BROWSER_WORKERS)
+    parser.add_argument("--download-workers", help="Number of yt-dlp workers for the download-videos step", type=int, default=DOWNLOAD_WORKERS)
+    parser.add_argument("--transcription-backend", help="Speech-to-text backend for the transcript step", choices=list(BACKENDS), default=TRANSCRIPTION_BACKEND)
+    parser.add_argument("--whisper-model", help="Model size for the transcript step", default=WHISPER_MODEL)
+    parser.add_argument("--decode-workers", help="Number of ffmpeg audio decoding processes for the transcript step", type=int, default=DECODE_WORKERS)
+    parser.add_argument("--inference-workers", help="Number of Whisper model workers for the transcript step", type=int, default=INFERENCE_WORKERS)
+    parser.add_argument("--agent-concurrency", help="Number of videos processed at the same time by the agent", type=int, default=AGENT_CONCURRENCY)
+    parser.add_argument("--search-concurrency", help="Max simultaneous SearXNG requests in the agent step", type=int, default=SEARCH_CONCURRENCY)
+    parser.add_argument("--llm-concurrency", help="Max simultaneous LLM requests in the agent step", type=int, default=LLM_CONCURRENCY)
+    parser.add_argument("--entity-cache-ttl-days", help="Days a cached entity web search/summary stays valid", type=float, default=ENTITY_CACHE_TTL_DAYS)
+    parser.add_argument("--web-context-tokens", help="Token budget of the web documents sent to each entity summary", type=int, default=WEB_CONTEXT_TOKENS)
+    parser.add_argument("--tokenizer-url", help="Model tokenizer endpoint used to count web context tokens (llama.cpp /tokenize); empty to estimate from characters", default=TOKENIZER_URL)
+    parser.add_argument("--full-pages", help="Also download the top search result pages for each entity (needs aiohttp)", action=argparse.BooleanOptionalAction, default=FULL_PAGES)
+    parser.add_argument("--full-page-urls", help="Max pages downloaded per entity with --full-pages", type=int, default=FULL_PAGE_URLS)
+    parser.add_argument("--collection-api", help="Read the collection from its item-list API responses instead of the page links (also saves each video's metadata)", action="store_true")
+    parser.add_argument("--lean-browser", help="Block images, fonts and video streams in the scraping browsers and use an eager page load", action=argparse.BooleanOptionalAction, default=LEAN_BROWSER)
+    parser.add_argument("--measure-page-bytes", help="Report the bytes each video page downloads in the scraping browsers", action="store_true")
+    parser.add_argument("--streaming", help="Run download-videos, transcript and agent at the same time, moving each video on as soon as it is ready", action="store_true")
+    parser.add_argument("--vad", help="Only transcribe speech regions and skip music-only/silent videos", action=argparse.BooleanOptionalAction, default=USE_VAD)
 
     args = parser.parse_args()
     COLLECTION_URL = args.url
 
+    configure_concurrency(search=args.search_concurrency, llm_calls=args.llm_concurrency)
+    configure_entity_cache(ttl_days=args.entity_cache_ttl_days)
+    configure_context_budget(args.web_context_tokens, tokenizer_url=args.tokenizer_url or None)
+    configure_full_pages(args.full_pages, args.full_page_urls)
+
     first_step = args.first_step
     possible_steps = ["download-url", "download-videos", "transcript", "agent", "data-cleaning"]
     if first_step not in possible_steps:
@@ -40,14 +93,37 @@ if __name__ == "__main__":
     
 
     print(f"Using collection URL: {COLLECTION_URL}")
+
+    # Estado del pipeline. La primera vez se reconstruye a partir de los ficheros existentes
+    state = PipelineStateStore(STATE_DB)
+    if state.is_empty():
+        recovered = state.backfill(DATA_FOLDER, VIDEOS_FOLDER, TRANSCRIPTS_FOLDER, RESULT_FOLDER)
+        if recovered:
+            print(f"Estado reconstruido a partir de {recovered} videos existentes")
+
+    # Navegadores compartidos por el scraper de la colección y los de videos: Chrome se
+    # arranca una vez y se reutiliza entre etapas (se recicla tras muchas páginas)
+    # La colección necesita uno más mientras los workers de videos ya trabajan en streaming
+    browser_pool = BrowserPool(
+        size=args.browser_workers + (1 if args.streaming else 0),
+        headless=False,  # Cambiar a True para modo headless
+        max_pages=BROWSER_MAX_PAGES,
+        max_memory_mb=BROWSER_MAX_MEMORY_MB,
+        warm=False,
+        lean=args.lean_browser,
+        measure_bytes=args.measure_page_bytes
+    )
+
     # DESCARGA DE URLS
     if first_step_num > 0:
         print("Skipping URL download step.")
+    elif args.streaming:
+        print("Las URLs de la colección se recogen dentro del pipeline en streaming.")
     else:
         # URL de la colección de TikTok
 
         # Crear el scraper
-        scraper = TikTokCollectionScraper(headless=False)  # Cambiar a True para modo headless
+        scraper = TikTokCollectionScraper(capture_api=args.collection_api, browser_pool=browser_pool)
 
         try:
             # Hacer scraping
@@ -61,55 +137,119 @@ if __name__ == "__main__":
             # Guardar en archivo
             if urls:
                 scraper.save_urls(urls, COLLECTION_URL_FILE)
+                print(f"URLs nuevas: {state.add_urls(urls)}")
             
         finally:
             scraper.close()
 
-    # DESCARGA DE VIDEOS
-    if first_step_num > 1:
-        print("Skipping video download.")
+    # DESCARGA, TRANSCRIPCIÓN Y AGENTE EN STREAMING
+    # Cada video pasa a la siguiente etapa en cuanto termina la anterior
+    if args.streaming and first_step_num <= 3:
+        collection_scraper = None
+        harvested = []
+        if first_step_num == 0:
+            # Los videos empiezan a procesarse mientras el scraper de la colección sigue haciendo scroll
+            collection_scraper = TikTokCollectionScraper(capture_api=args.collection_api, browser_pool=browser_pool)
+
+            def harvest_urls():
+                for url in collection_scraper.iter_collection(COLLECTION_URL, max_scrolls=15):
+                    harvested.append(url)
+                    yield url
+        elif first_step_num == 1:
+            with open(COLLECTION_URL_FILE, 'r') as file:
+                state.add_urls(json.load(file)["urls"])
+        os.makedirs(RESULT_FOLDER, exist_ok=True)
+        try:
+            run_video_pipeline(
+                state,
+                first_stage=["scrape", "scrape", "transcribe", "agent"][first_step_num],
+                browser_workers=args.browser_workers,
+                download_workers=args.download_workers,
+                decode_workers=args.decode_workers,
+                inference_workers=args.inference_workers,
+                agent_workers=args.agent_concurrency,
+                headless=False,
+                whisper_model=args.whisper_model,
+                backend=args.transcription_backend,
+                vad=args.vad,
+                transcript_cache_path=TRANSCRIPT_CACHE,
+                transcript_cache_mb=TRANSCRIPT_CACHE_MB,
+                data_folder=DATA_FOLDER,
+                videos_folder=VIDEOS_FOLDER,
+                transcripts_folder=TRANSCRIPTS_FOLDER,
+                result_folder=RESULT_FOLDER,
+                url_source=harvest_urls() if collection_scraper is not None else None,
+                browser_pool=browser_pool
+            )
+        finally:
+            if collection_scraper is not None:
+                if harvested:
+                    collection_scraper.save_urls(harvested, COLLECTION_URL_FILE)
+                collection_scraper.close()
+        close_page_fetcher()
     else:
-        # Crear el scraper
-        scraper = TikTokVideoScraper(headless=False)
+        # DESCARGA DE VIDEOS
+        if first_step_num > 1:
+            print("Skipping video download.")
+        else:
+            # Load TikTok URLs from the JSON file
+            with open(COLLECTION_URL_FILE, 'r') as file:
+                tiktok_urls = json.load(file)
+            state.add_urls(tiktok_urls["urls"])
 
-        # Load TikTok URLs from the JSON file
-        with open(COLLECTION_URL_FILE, 'r') as file:
-            tiktok_urls = json.load(file)
+            # Solo los videos sin scrapear y los scrapeados sin descargar
+            to_scrape = [row["url"] for row in state.pending("scraped")]
+            to_download = {row["url"]: (row["video_id"], row["file_key"]) for row in state.pending("downloaded")}
+            print(f"Videos pendientes: {len(to_scrape)} por scrapear, {len(to_download)} por descargar")
 
-        for url in tiktok_urls["urls"]:
-            print(f"Processing URL: {url}")
-            scraper.process_video(url)
+            # Navegadores y descargas en paralelo
+            pool = VideoIngestionPool(
+                browser_workers=args.browser_workers,
+                download_workers=args.download_workers,
+                headless=False,
+                state_store=state,
+                browser_pool=browser_pool
+            )
+            pool.run(to_scrape, scraped=to_download)
 
-    # TRANSCRIPCIÓN DE AUDIOS
-    if first_step_num > 2:
-        print("Skipping transcription step.")
-    else:
-        transcribe_videos(VIDEOS_FOLDER, TRANSCRIPTS_FOLDER, WHISPER_MODEL)
+        # TRANSCRIPCIÓN DE AUDIOS
+        if first_step_num > 2:
+            print("Skipping transcription step.")
+        else:
+            pending = {f"tiktok_video_{row['file_key']}.mp4": row["video_id"] for row in state.pending("transcribed")}
+            print(f"Videos pendientes de transcribir: {len(pending)}")
+            transcribed = transcribe_videos(
+                VIDEOS_FOLDER, TRANSCRIPTS_FOLDER, args.whisper_model, filenames=list(pending),
+                decode_workers=args.decode_workers, inference_workers=args.inference_workers,
+                backend=args.transcription_backend, vad=args.vad,
+                cache_path=TRANSCRIPT_CACHE, cache_max_mb=TRANSCRIPT_CACHE_MB
+            )
+            for filename, info in transcribed.items():
+                state.mark(pending[filename], "transcribed")
+                if info["no_speech"] is not None:
+                    state.set_no_speech(pending[filename], info["no_speech"])
 
-    # AGENTE
-    if first_step_num > 3:
-        print("Skipping agent step.")
-    else:
-        ids_total = [file[13:-4] for file in os.listdir(TRANSCRIPTS_FOLDER)]
-        if not os.path.exists(RESULT_FOLDER):
-            os.makedirs(RESULT_FOLDER)
-        ids_done = [file[7:-5] for file in os.listdir(RESULT_FOLDER)]
-        ids_pending = list(set(ids_total) - set(ids_done))
-        for id in ids_pending:
-            print(f"Processing video ID: {id}")
-            description_path = f"./data/tiktok_data_{id}.json"
-            with open(description_path, "r", encoding="utf-8") as f:
-                description = json.load(f)["basic_info"]["description"]
-
-            transcript_path = f"./transcripts/tiktok_video_{id}.txt"
-            with open(transcript_path, "r", encoding="utf-8") as f:
-                transcript = f.read()
-            example = {
-                "text": f"Descripción: {description}\nTranscripción: {transcript}"
-            }
-            result = app.invoke(example)
-            with open(f'{RESULT_FOLDER}/result_{id}.json', 'w') as f:
-                json.dump(result, f)
+        # AGENTE
+        if first_step_num > 3:
+            print("Skipping agent step.")
+        else:
+            if not os.path.exists(RESULT_FOLDER):
+                os.makedirs(RESULT_FOLDER)
+            pending = {row["file_key"]: row["video_id"] for row in state.pending("agent_done")}
+            print(f"Videos pendientes para el agente: {len(pending)}")
+            # Varios videos a la vez contra el servidor del LLM; cada resultado se guarda al terminar
+            asyncio.run(run_agent_batch(
+                list(pending),
+                concurrency=args.agent_concurrency,
+                data_folder=DATA_FOLDER,
+                transcripts_folder=TRANSCRIPTS_FOLDER,
+                result_folder=RESULT_FOLDER,
+                on_done=lambda id: state.mark(pending[id], "agent_done")
+            ))
+            close_page_fetcher()
+
+    browser_pool.print_stats()
+    browser_pool.close()
 
     # DATA CLEANING
     if first_step_num > 4:
@@ -119,19 +259,32 @@ if __name__ == "__main__":
         summaries = defaultdict(list)
         web_summaries = {}
 
+        # Índice para unir variantes de la misma entidad entre videos
+        entity_index = EntityIndex()
+
         for file_path in os.listdir(RESULT_FOLDER):
+            if not file_path.endswith(".json"):
+                continue
             print(f"Processing {file_path}...")
             with open(f"{RESULT_FOLDER}/{file_path}", "r", encoding="utf-8") as file:
                 data = json.load(file)
                 # Entities
-                entities.update(data["entities"])
+                for k, v in data["entities"].items():
+                    entities.setdefault(entity_index.canonicalize(k), v)
 
                 # Entities. Recorremos 1 a 1 porque puede haber solape y no nos interesa perder info de, por ejemplo, resumenes de videos
-                for k, v in json.loads(data["summaries"])["Summaries"].items():
-                    summaries[k].append(v)
+                # Parser tolerante para resultados antiguos guardados sin validar
+                try:
+                    video_summaries = parse_summaries(data["summaries"])
+                except OutputParsingError as e:
+                    print(f"Resúmenes no válidos en {file_path}: {e}")
+                    video_summaries = {}
+                for k, v in video_summaries.items():
+                    summaries[entity_index.canonicalize(k)].append(v)
 
                 # Web summaries
-                web_summaries.update(data["entities_web_summaries"])
+                for k, v in data["entities_web_summaries"].items():
+                    web_summaries.setdefault(entity_index.canonicalize(k), v)
 
         # Unimos descripciones de distintos videos pero misma entidad
         summaries = {x[0]: ' '.join(x[1]) for x in list(summaries.items())}
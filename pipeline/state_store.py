@@ -0,0 +1,174 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from tiktok_scraping.video_ids import extract_video_id_from_url, provisional_video_id
+
+# Etapas del pipeline en orden. Cada una solo puede hacerse si la anterior está hecha
+STAGES = ("url_seen", "scraped", "downloaded", "transcribed", "agent_done")
+
+# Otros datos por video
+EXTRA_COLUMNS = {
+    "no_speech": "INTEGER",  # 1 si el VAD no encontró voz (transcripción vacía)
+}
+
+
+class PipelineStateStore:
+    """
+    Estado persistente del pipeline por video (SQLite).
+
+    Guarda, para cada ID de video, la URL, la clave de sus ficheros y la fecha en
+    que terminó cada etapa, de forma que cada etapa procese solo lo pendiente.
+    """
+
+    def __init__(self, path="pipeline_state.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        stage_columns = ",\n".join(f"{stage}_at TEXT" for stage in STAGES)
+        with self._conn:
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS videos (
+                    video_id TEXT PRIMARY KEY,
+                    url TEXT,
+                    file_key TEXT,
+                    {stage_columns}
+                )
+            """)
+            # Columnas añadidas después de la primera versión del esquema
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(videos)")}
+            for column, definition in EXTRA_COLUMNS.items():
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE videos ADD COLUMN {column} {definition}")
+
+    def _check_stage(self, stage):
+        if stage not in STAGES:
+            raise ValueError(f"Etapa no válida: {stage}. Valores posibles: {STAGES}")
+
+    @staticmethod
+    def url_key(url):
+        """
+        Clave con la que se registra una URL: su ID de video o, si no lo tiene
+        (enlaces cortos tiktok.com/t/...), una provisional que resolve() cambia
+        por el ID real cuando se scrapea
+        """
+        return extract_video_id_from_url(url) or provisional_video_id(url)
+
+    def add_urls(self, urls):
+        """Registra URLs nuevas (las ya conocidas se ignoran). Devuelve cuántas eran nuevas"""
+        now = datetime.now().isoformat()
+        rows = [(self.url_key(url), url, now) for url in urls]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO videos (video_id, url, url_seen_at) VALUES (?, ?, ?)", rows
+            )
+            return self._conn.total_changes - before
+
+    def key_for_url(self, url):
+        """Clave con la que está registrada una URL (url_key si no está registrada)"""
+        with self._lock:
+            row = self._conn.execute("SELECT video_id FROM videos WHERE url = ?", (url,)).fetchone()
+        return row["video_id"] if row else self.url_key(url)
+
+    def resolve(self, url, video_id):
+        """
+        Pasa el registro de una URL a su ID real si estaba con otra clave
+        (enlace corto). Si el video ya estaba registrado por otra URL, se
+        queda el registro existente
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT video_id FROM videos WHERE url = ?", (url,)).fetchone()
+            if row is None or row["video_id"] == video_id:
+                return
+            exists = self._conn.execute("SELECT 1 FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+            if exists:
+                self._conn.execute("DELETE FROM videos WHERE video_id = ?", (row["video_id"],))
+            else:
+                self._conn.execute("UPDATE videos SET video_id = ? WHERE video_id = ?", (video_id, row["video_id"]))
+
+    def mark(self, video_id, stage, file_key=None):
+        """Marca una etapa como hecha para un video"""
+        self._check_stage(stage)
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO videos (video_id, url_seen_at) VALUES (?, ?)", (video_id, now)
+            )
+            self._conn.execute(f"UPDATE videos SET {stage}_at = ? WHERE video_id = ?", (now, video_id))
+            if file_key is not None:
+                self._conn.execute("UPDATE videos SET file_key = ? WHERE video_id = ?", (file_key, video_id))
+
+    def set_no_speech(self, video_id, no_speech):
+        """Guarda si la transcripción del video se saltó por no tener voz"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE videos SET no_speech = ? WHERE video_id = ?", (int(no_speech), video_id))
+
+    def pending(self, stage):
+        """Devuelve los videos con la etapa anterior hecha y esta pendiente"""
+        self._check_stage(stage)
+        index = STAGES.index(stage)
+        conditions = [f"{stage}_at IS NULL"]
+        if index > 0:
+            conditions.append(f"{STAGES[index - 1]}_at IS NOT NULL")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM videos WHERE {' AND '.join(conditions)} ORDER BY url_seen_at, video_id"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get(self, video_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return dict(row) if row else None
+
+    def counts(self):
+        """Número de videos que han completado cada etapa"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT " + ", ".join(f"COUNT({stage}_at)" for stage in STAGES) + " FROM videos"
+            ).fetchone()
+        return dict(zip(STAGES, row))
+
+    def is_empty(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0] == 0
+
+    def backfill(self, data_folder, videos_folder, transcripts_folder, result_folder):
+        """Reconstruye el estado a partir de los ficheros de ejecuciones anteriores"""
+        if not os.path.isdir(data_folder):
+            return 0
+        found = 0
+        for filename in os.listdir(data_folder):
+            if not (filename.startswith("tiktok_data_") and filename.endswith(".json")):
+                continue
+            file_key = filename[len("tiktok_data_"):-len(".json")]
+            try:
+                with open(os.path.join(data_folder, filename), "r", encoding="utf-8") as f:
+                    video_data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            url = video_data.get("url")
+            video_id = (extract_video_id_from_url(url) if url else None) \
+                or video_data.get("metadata", {}).get("video_id") or file_key
+
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO videos (video_id, url, url_seen_at) VALUES (?, ?, ?)",
+                    (video_id, url, datetime.now().isoformat())
+                )
+            self.mark(video_id, "scraped", file_key=file_key)
+            if os.path.exists(os.path.join(videos_folder, f"tiktok_video_{file_key}.mp4")):
+                self.mark(video_id, "downloaded")
+            if os.path.exists(os.path.join(transcripts_folder, f"tiktok_video_{file_key}.txt")):
+                self.mark(video_id, "transcribed")
+            if os.path.exists(os.path.join(result_folder, f"result_{file_key}.json")):
+                self.mark(video_id, "agent_done")
+            found += 1
+        return found
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,315 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import Callable, Dict, Iterable, List, Optional
+
+from agent.agent import app
+from agent.batch_driver import build_example, write_result
+from audio_to_text.backends import decode_audio
+from audio_to_text.transcript_cache import TranscriptCache, file_sha256
+from audio_to_text.transcription_engine import TranscriptionEngine, is_up_to_date
+from tiktok_scraping.browser_pool import BrowserPool
+from tiktok_scraping.tiktok_video_scraper import TikTokVideoScraper
+
+# Marca de fin de cola
+_STOP = object()
+
+
+class Stage:
+    """
+    Etapa del pipeline en streaming: `workers` hilos que consumen su cola de
+    entrada (acotada) y pasan el resultado a la siguiente etapa.
+
+    process(context, item) devuelve el item para la siguiente etapa, o None si
+    falló. setup() crea el recurso de cada worker (un navegador, por ejemplo)
+    y teardown(context) lo libera.
+    """
+
+    def __init__(self, name: str, process: Callable, workers: int = 1, queue_size: Optional[int] = None,
+                 setup: Optional[Callable] = None, teardown: Optional[Callable] = None):
+        if workers < 1:
+            raise ValueError(f"La etapa {name} necesita al menos un worker")
+        self.name = name
+        self.process = process
+        self.workers = workers
+        self.setup = setup
+        self.teardown = teardown
+        # La cola acotada frena a la etapa anterior si esta va por detrás (backpressure)
+        self.queue = queue.Queue(maxsize=queue_size or workers * 2)
+        self._lock = threading.Lock()
+        self.ok = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+
+    def record(self, ok: bool, seconds: float):
+        with self._lock:
+            if ok:
+                self.ok += 1
+            else:
+                self.failed += 1
+            self.busy_seconds += seconds
+
+
+class StreamingPipeline:
+    """
+    Ejecuta etapas encadenadas a la vez: cada video pasa a la siguiente etapa
+    en cuanto termina la anterior, en lugar de esperar a que todos los videos
+    terminen cada etapa. Así el navegador, yt-dlp, Whisper y el LLM trabajan
+    en paralelo.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+
+    def _worker(self, index: int, worker_id: int):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        context = None
+        ready = True
+        if stage.setup is not None:
+            try:
+                context = stage.setup()
+            except Exception as e:
+                # Sin su recurso el worker sigue vaciando la cola para no bloquear a la etapa anterior
+                print(f"[{stage.name} {worker_id}] Error al iniciar: {e}")
+                ready = False
+        try:
+            while True:
+                item = stage.queue.get()
+                if item is _STOP:
+                    break
+                start = time.perf_counter()
+                output = None
+                if ready:
+                    try:
+                        output = stage.process(context, item)
+                    except Exception as e:
+                        print(f"[{stage.name} {worker_id}] Error con {item.get('video_id')}: {e}")
+                stage.record(output is not None, time.perf_counter() - start)
+                if output is not None and next_stage is not None:
+                    next_stage.queue.put(output)
+        finally:
+            if context is not None and stage.teardown is not None:
+                stage.teardown(context)
+
+    @staticmethod
+    def _feed(stage: Stage, items: Iterable[dict]):
+        try:
+            for item in items:
+                stage.queue.put(item)
+        except Exception as e:
+            print(f"[{stage.name}] Error generando items: {e}")
+
+    def run(self, seeds: Dict[str, Iterable[dict]]) -> Dict:
+        """
+        seeds: {nombre de etapa: items} con los videos que empiezan en esa etapa
+        (por ejemplo, los ya descargados empiezan en la transcripción). Los
+        items pueden ser un generador que se va consumiendo durante la ejecución.
+        Devuelve un resumen por etapa.
+        """
+        start = time.perf_counter()
+        workers = []
+        for index, stage in enumerate(self.stages):
+            threads = [
+                threading.Thread(target=self._worker, args=(index, i + 1), name=f"{stage.name}-{i + 1}", daemon=True)
+                for i in range(stage.workers)
+            ]
+            for thread in threads:
+                thread.start()
+            workers.append(threads)
+
+        # Los items iniciales se encolan desde hilos propios porque las colas están acotadas
+        feeders = []
+        for stage in self.stages:
+            feeder = threading.Thread(target=self._feed, args=(stage, seeds.get(stage.name, [])), daemon=True)
+            feeder.start()
+            feeders.append(feeder)
+
+        # Cada etapa se cierra cuando no le pueden llegar más items: su feeder y la etapa anterior han terminado
+        for index, stage in enumerate(self.stages):
+            feeders[index].join()
+            if index > 0:
+                for thread in workers[index - 1]:
+                    thread.join()
+            for _ in range(stage.workers):
+                stage.queue.put(_STOP)
+        for thread in workers[-1]:
+            thread.join()
+
+        elapsed = time.perf_counter() - start
+        summary = {"elapsed_seconds": elapsed, "stages": {}}
+        for stage in self.stages:
+            summary["stages"][stage.name] = {
+                "ok": stage.ok,
+                "failed": stage.failed,
+                "busy_seconds": stage.busy_seconds,
+                # Fracción del tiempo que los workers de la etapa estuvieron trabajando
+                "utilization": stage.busy_seconds / (elapsed * stage.workers) if elapsed > 0 else 0.0,
+            }
+        last = self.stages[-1]
+        summary["videos_per_minute"] = last.ok / elapsed * 60 if elapsed > 0 else 0.0
+        self.print_summary(summary)
+        return summary
+
+    @staticmethod
+    def print_summary(summary: Dict):
+        print("\n=== PIPELINE EN STREAMING ===")
+        print(f"Tiempo total: {summary['elapsed_seconds']:.1f} s "
+              f"({summary['videos_per_minute']:.2f} videos/min completos)")
+        for name, stats in summary["stages"].items():
+            done = stats["ok"] + stats["failed"]
+            mean = stats["busy_seconds"] / done if done else 0.0
+            print(f"{name:<11} {stats['ok']} ok, {stats['failed']} fallidos, {mean:.1f} s/video, "
+                  f"ocupación {stats['utilization']:.0%}")
+
+
+# Etapas del pipeline de videos y etapa del state store que completa cada una
+VIDEO_STAGES = {
+    "scrape": "scraped",
+    "download": "downloaded",
+    "transcribe": "transcribed",
+    "agent": "agent_done",
+}
+
+# La transcripción se hace en dos etapas: decodificar el audio (en procesos) y pasar el modelo;
+# los videos pendientes de transcribir entran por la decodificación
+ENTRY_STAGES = {"transcribe": "decode"}
+
+
+def run_video_pipeline(state, first_stage: str = "scrape", browser_workers: int = 2, download_workers: int = 4,
+                       decode_workers: int = 2, inference_workers: int = 1, agent_workers: int = 4, headless: bool = True,
+                       whisper_model: str = "base", backend: str = "whisper", vad: bool = False,
+                       transcript_cache_path: Optional[str] = None, transcript_cache_mb: int = 256,
+                       data_folder: str = "./data", videos_folder: str = "./downloads",
+                       transcripts_folder: str = "./transcripts", result_folder: str = "./results",
+                       url_source: Optional[Iterable[str]] = None, browser_pool: Optional[BrowserPool] = None) -> Dict:
+    """
+    Scraping, descarga, transcripción y agente en streaming sobre los videos
+    pendientes del state store. Los videos entran en la etapa que les toca
+    según su estado, empezando como pronto en first_stage.
+
+    url_source: URLs nuevas que se van descubriendo durante la ejecución (por
+    ejemplo, las del scraper de colecciones mientras hace scroll).
+    browser_pool: pool de Chrome compartido; sin él se crea uno para esta ejecución.
+    """
+    if first_stage not in VIDEO_STAGES:
+        raise ValueError(f"Etapa no válida: {first_stage}. Valores posibles: {list(VIDEO_STAGES)}")
+
+    def scrape(scraper, item):
+        video_data, file_key = scraper.scrape_video(item["url"])
+        if not video_data or not file_key:
+            return None
+        # Los enlaces cortos están registrados con una clave provisional hasta conocer el ID
+        state.resolve(item["url"], file_key)
+        state.mark(file_key, "scraped", file_key=file_key)
+        return {**item, "video_id": file_key, "file_key": file_key, "video_url": video_data["url"]}
+
+    def download(_, item):
+        video_url = item.get("video_url") or item["url"]
+        if not TikTokVideoScraper.download_with_ytdlp(video_url, item["file_key"], output_dir=videos_folder):
+            return None
+        state.mark(item["video_id"], "downloaded")
+        return item
+
+    engine = TranscriptionEngine(whisper_model, inference_workers=inference_workers, backend=backend, vad=vad)
+    cache = TranscriptCache(transcript_cache_path, max_mb=transcript_cache_mb) if transcript_cache_path else None
+    os.makedirs(transcripts_folder, exist_ok=True)
+
+    decoders = ProcessPoolExecutor(max(1, decode_workers))
+
+    def decode(_, item):
+        video_path = os.path.join(videos_folder, f"tiktok_video_{item['file_key']}.mp4")
+        output_path = os.path.join(transcripts_folder, f"tiktok_video_{item['file_key']}.txt")
+        if not os.path.exists(video_path):
+            print(f"Video no encontrado: {video_path}")
+            return None
+        item = {**item, "video_path": video_path, "output_path": output_path}
+
+        # Si la transcripción ya existe o está en la caché no hace falta decodificar
+        if is_up_to_date(video_path, output_path):
+            return {**item, "info": {"no_speech": None}}
+        key = TranscriptCache.key(file_sha256(video_path), backend, whisper_model, vad) if cache else None
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(cached["text"])
+            return {**item, "info": {"no_speech": cached["no_speech"]}}
+
+        try:
+            audio, vad_info = decoders.submit(decode_audio, backend, video_path, vad).result()
+        except Exception as e:
+            print(f"Error decoding audio from {video_path}: {e}")
+            return None
+        return {**item, "cache_key": key, "audio": audio, "vad_info": vad_info}
+
+    def transcribe(_, item):
+        info = item.pop("info", None)
+        if info is None:
+            audio, vad_info = item.pop("audio"), item.pop("vad_info")
+            info = engine.transcribe_decoded(item["video_path"], item["output_path"], audio, vad_info)
+            if info is None:
+                return None
+            if cache is not None:
+                with open(item["output_path"], "r", encoding="utf-8") as f:
+                    cache.set(item["cache_key"], f.read(), info["no_speech"])
+
+        state.mark(item["video_id"], "transcribed")
+        if info["no_speech"] is not None:
+            state.set_no_speech(item["video_id"], info["no_speech"])
+        return item
+
+    def run_agent(_, item):
+        print(f"Processing video ID: {item['file_key']}")
+        result = app.invoke(build_example(item["file_key"], data_folder, transcripts_folder))
+        write_result(item["file_key"], result, result_folder)
+        state.mark(item["video_id"], "agent_done")
+        return item
+
+    # Navegadores compartidos por los workers de scraping; arrancan al necesitarse y se reutilizan
+    own_pool = browser_pool is None
+    if own_pool:
+        browser_pool = BrowserPool(size=browser_workers, headless=headless, warm=False)
+    stages = [
+        Stage("scrape", scrape, browser_workers,
+              setup=lambda: TikTokVideoScraper(headless=headless, browser_pool=browser_pool),
+              teardown=lambda scraper: scraper.close()),
+        Stage("download", download, download_workers),
+        # Los hilos de decodificación solo esperan a su proceso; la cola de la transcripción
+        # limita el audio decodificado en memoria
+        Stage("decode", decode, max(1, decode_workers)),
+        Stage("transcribe", transcribe, inference_workers),
+        Stage("agent", run_agent, agent_workers),
+    ]
+    names = [stage.name for stage in stages]
+    stages = stages[names.index(ENTRY_STAGES.get(first_stage, first_stage)):]
+
+    seeds = {}
+    steps = list(VIDEO_STAGES)
+    for step in steps[steps.index(first_stage):]:
+        seeds[ENTRY_STAGES.get(step, step)] = [
+            {"video_id": row["video_id"], "url": row["url"], "file_key": row["file_key"]}
+            for row in state.pending(VIDEO_STAGES[step])
+        ]
+    print("Videos pendientes por etapa: " + ", ".join(f"{name} {len(items)}" for name, items in seeds.items()))
+
+    if url_source is not None and stages[0].name == "scrape":
+        def new_urls():
+            for url in url_source:
+                # Solo las URLs que el state store no conocía; las conocidas ya están en las semillas
+                if state.add_urls([url]):
+                    yield {"video_id": state.key_for_url(url), "url": url, "file_key": None}
+        seeds["scrape"] = chain(seeds["scrape"], new_urls())
+
+    try:
+        summary = StreamingPipeline(stages).run(seeds)
+    finally:
+        decoders.shutdown()
+        if own_pool:
+            browser_pool.print_stats()
+            browser_pool.close()
+    if cache is not None:
+        cache.print_stats()
+    return summary
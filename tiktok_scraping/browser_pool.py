@@ -0,0 +1,329 @@
+import atexit
+import json
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+
+CHROMEDRIVER_PATH = 'C://chromedriver-win64//chromedriver.exe'
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Perfil ligero: recursos que los scrapers no necesitan (los metadatos salen del DOM
+# y el video lo descarga yt-dlp). Comodines de Network.setBlockedURLs
+BLOCKED_URL_PATTERNS = [
+    # Imágenes (TikTok sirve avatares y portadas como .image, .jpeg o .webp)
+    "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.image?*",
+    # Fuentes
+    "*.woff*", "*.ttf*", "*.otf*",
+    # Video y audio, incluidos los streams sin extensión del CDN de TikTok
+    "*.mp4*", "*.webm*", "*.m4a*", "*.mp3*", "*.m3u8*", "*mime_type=video*", "*/video/tos/*",
+]
+
+
+def chrome_options(headless=True, performance_log=False, lean=False):
+    """
+    Opciones de Chrome comunes a todos los scrapers. Devuelve (options, capabilities).
+    Con lean no se cargan imágenes, driver.get vuelve con el DOM listo (sin
+    esperar a imágenes y subrecursos) y los videos no se reproducen solos
+    """
+    options = Options()
+    if headless:
+        options.add_argument("--headless")
+
+    # Opciones para evitar detección
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+
+    # User agent para parecer un navegador real
+    options.add_argument(f"--user-agent={USER_AGENT}")
+
+    capabilities = DesiredCapabilities.CHROME.copy()
+    if performance_log:
+        # Log de rendimiento con los eventos de red (para capturar respuestas de la API)
+        capabilities['goog:loggingPrefs'] = {'performance': 'ALL'}
+
+    if lean:
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        options.add_argument("--autoplay-policy=user-gesture-required")
+        options.add_argument("--mute-audio")
+        capabilities['pageLoadStrategy'] = 'eager'
+    return options, capabilities
+
+
+def create_driver(headless=True, performance_log=False, lean=False):
+    """Arranca un Chrome con las opciones comunes"""
+    options, capabilities = chrome_options(headless, performance_log, lean)
+    driver = webdriver.Chrome(executable_path=CHROMEDRIVER_PATH, options=options, desired_capabilities=capabilities)
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    if lean:
+        # Las fuentes y los streams de video no se pueden desactivar con opciones: se bloquean por URL
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    return driver
+
+
+def transferred_bytes(log_entries):
+    """
+    Bytes recibidos por la red y peticiones bloqueadas según las entradas del
+    log de rendimiento de Chrome (driver.get_log("performance")).
+    Devuelve (bytes, bloqueadas)
+    """
+    received = {}
+    finished = {}
+    blocked = 0
+    for entry in log_entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        method = message.get("method")
+        params = message.get("params", {})
+        request_id = params.get("requestId")
+        if method == "Network.dataReceived":
+            received[request_id] = received.get(request_id, 0) + params.get("encodedDataLength", 0)
+        elif method == "Network.loadingFinished":
+            finished[request_id] = params.get("encodedDataLength", 0)
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            blocked += 1
+    # Las peticiones canceladas (un stream de video al salir de la página) no llegan a
+    # loadingFinished; para el resto el total de loadingFinished incluye las cabeceras
+    total = sum(max(received.get(request_id, 0), finished.get(request_id, 0))
+                for request_id in received.keys() | finished.keys())
+    return total, blocked
+
+
+def browser_memory_mb(driver):
+    """Memoria (RSS) de chromedriver y todos sus procesos de Chrome. None sin psutil"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+    except Exception:
+        return None
+    total = 0
+    for p in processes:
+        try:
+            total += p.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / (1024 * 1024)
+
+
+class PooledDriver:
+    """Un Chrome del pool con las páginas que lleva abiertas"""
+
+    def __init__(self, driver, performance_log=False):
+        self.driver = driver
+        self.performance_log = performance_log
+        self.pages = 0
+        self.started_at = time.perf_counter()
+
+
+class BrowserPool:
+    """
+    Pool de Chrome compartido por los scrapers.
+
+    Hasta `size` navegadores que se prestan de uno en uno (lease) y se
+    devuelven al terminar, de forma que el arranque de Chrome se paga una vez
+    y no por scraper. Antes de prestar un navegador se comprueba que responde;
+    al devolverlo se recicla (se cierra y se arranca otro) si ha abierto
+    max_pages páginas o si su memoria supera max_memory_mb (requiere psutil).
+
+    Con lean los navegadores usan el perfil ligero (ver chrome_options). El
+    log de rendimiento solo se activa en los navegadores que lo piden al
+    prestarse (acquire(performance_log=True)), o en todos con performance_log
+    o con measure_bytes, que lo usa para medir con measure_page los bytes que
+    descarga cada página. Lo que queda en el log se descarta al devolverlos.
+    """
+
+    def __init__(self, size=2, headless=True, max_pages=200, max_memory_mb=None, performance_log=False,
+                 warm=True, lean=False, measure_bytes=False):
+        if size < 1:
+            raise ValueError("El pool necesita al menos un navegador")
+        self.size = size
+        self.headless = headless
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.performance_log = performance_log or measure_bytes
+        self.lean = lean
+        self.measure_bytes = measure_bytes
+        # Navegadores libres sin y con log de rendimiento
+        self._idle = {False: queue.LifoQueue(), True: queue.LifoQueue()}
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._all = set()
+        self._closed = False
+        self.stats = {'started': 0, 'recycled': 0, 'unhealthy': 0, 'leases': 0,
+                      'measured_pages': 0, 'bytes': 0, 'blocked': 0}
+        atexit.register(self.close)
+        if warm:
+            self.warm_up()
+
+    def warm_up(self, count=None):
+        """Arranca los navegadores por adelantado (en paralelo)"""
+        count = self.size if count is None else count
+        started = []
+
+        def start():
+            try:
+                started.append(self._start())
+            except Exception as e:
+                print(f"Error arrancando Chrome: {e}")
+
+        idle = sum(q.qsize() for q in self._idle.values())
+        threads = [threading.Thread(target=start) for _ in range(max(0, count - idle))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for pooled in started:
+            self._idle[pooled.performance_log].put(pooled)
+
+    def _start(self, performance_log=False):
+        performance_log = self.performance_log or performance_log
+        pooled = PooledDriver(create_driver(self.headless, performance_log, self.lean), performance_log)
+        with self._lock:
+            self._all.add(pooled)
+            self.stats['started'] += 1
+        return pooled
+
+    def _quit(self, pooled):
+        with self._lock:
+            self._all.discard(pooled)
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _healthy(pooled):
+        try:
+            pooled.driver.execute_script("return document.readyState")
+            return True
+        except Exception:
+            return False
+
+    def _should_recycle(self, pooled):
+        if self.max_pages and pooled.pages >= self.max_pages:
+            return f"{pooled.pages} páginas"
+        if self.max_memory_mb:
+            memory = browser_memory_mb(pooled.driver)
+            if memory is not None and memory > self.max_memory_mb:
+                return f"{memory:.0f} MB de memoria"
+        return None
+
+    def acquire(self, performance_log=False):
+        """
+        Presta un navegador sano (espera si están todos prestados). Con
+        performance_log, uno con el log de rendimiento activado
+        """
+        if self._closed:
+            raise RuntimeError("El pool de navegadores está cerrado")
+        performance_log = self.performance_log or performance_log
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    pooled = self._idle[performance_log].get_nowait()
+                except queue.Empty:
+                    # Si hay uno libre del otro tipo se cierra, para no pasar de size navegadores
+                    try:
+                        self._quit(self._idle[not performance_log].get_nowait())
+                    except queue.Empty:
+                        pass
+                    pooled = self._start(performance_log)
+                if self._healthy(pooled):
+                    break
+                print("Chrome no responde, arrancando otro")
+                with self._lock:
+                    self.stats['unhealthy'] += 1
+                self._quit(pooled)
+            with self._lock:
+                self.stats['leases'] += 1
+            return pooled
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, pooled, pages=1):
+        """Devuelve un navegador al pool tras abrir `pages` páginas, reciclándolo si toca"""
+        pooled.pages += pages
+        try:
+            reason = self._should_recycle(pooled)
+            if reason is None and not self._closed:
+                try:
+                    if pooled.performance_log:
+                        # Nadie va a leer lo que quede en el log; sin vaciarlo crece sin límite
+                        pooled.driver.get_log("performance")
+                    # Página en blanco para liberar el video y los scripts de la anterior
+                    pooled.driver.get("about:blank")
+                except Exception:
+                    reason = "no responde"
+            if self._closed or reason is not None:
+                if reason is not None:
+                    print(f"Reciclando Chrome ({reason})")
+                    with self._lock:
+                        self.stats['recycled'] += 1
+                self._quit(pooled)
+            else:
+                self._idle[pooled.performance_log].put(pooled)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def lease(self, pages=1, performance_log=False):
+        """with pool.lease() as driver: ..."""
+        pooled = self.acquire(performance_log)
+        try:
+            yield pooled.driver
+        finally:
+            self.release(pooled, pages)
+
+    def measure_page(self, driver):
+        """
+        Bytes descargados por el navegador desde la última medición (la página
+        recién abierta). Vacía el log de rendimiento. None sin measure_bytes
+        """
+        if not self.measure_bytes:
+            return None
+        try:
+            total, blocked = transferred_bytes(driver.get_log("performance"))
+        except Exception as e:
+            print(f"No se pudo leer el log de rendimiento: {e}")
+            return None
+        with self._lock:
+            self.stats['measured_pages'] += 1
+            self.stats['bytes'] += total
+            self.stats['blocked'] += blocked
+        return total
+
+    def print_stats(self):
+        print(f"Navegadores: {self.stats['started']} arrancados, {self.stats['leases']} préstamos, "
+              f"{self.stats['recycled']} reciclados, {self.stats['unhealthy']} caídos")
+        pages = self.stats['measured_pages']
+        if pages:
+            print(f"Tráfico ({'perfil ligero' if self.lean else 'perfil completo'}): "
+                  f"{self.stats['bytes'] / pages / 1024:.0f} KB/página en {pages} páginas, "
+                  f"{self.stats['blocked']} peticiones bloqueadas")
+
+    def close(self):
+        """Cierra todos los navegadores, también los prestados"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            drivers = list(self._all)
+        # Ya cerrado, el pool no tiene que seguir vivo hasta el final del proceso
+        atexit.unregister(self.close)
+        for pooled in drivers:
+            self._quit(pooled)
@@ -0,0 +1,172 @@
+import json
+import re
+from datetime import datetime, timezone
+
+# Patrones comunes para URLs de video de TikTok en el código fuente
+DOWNLOAD_URL_PATTERNS = [
+    r'"playAddr":"([^"]+)"',
+    r'"downloadAddr":"([^"]+)"',
+    r'"playapi":"([^"]+)"',
+    r'videoUrl":"([^"]+)"'
+]
+
+# Scripts con el estado inicial que TikTok incrusta en la página (versión actual y antigua)
+HYDRATION_SCRIPT_IDS = ["__UNIVERSAL_DATA_FOR_REHYDRATION__", "SIGI_STATE"]
+
+_JSON_LD_PATTERN = re.compile(
+    r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE
+)
+
+
+def clean_download_url(url):
+    """Limpia URLs de video (TikTok a veces las codifica)"""
+    return url.replace('\\u002F', '/').replace('\\', '')
+
+
+def find_download_urls(page_source):
+    """Busca URLs de video en el código fuente con DOWNLOAD_URL_PATTERNS"""
+    download_urls = {}
+    for i, pattern in enumerate(DOWNLOAD_URL_PATTERNS):
+        matches = re.findall(pattern, page_source)
+        if matches:
+            download_urls[f'pattern_{i+1}'] = [clean_download_url(url) for url in matches]
+    return download_urls
+
+
+def extract_hydration_json(html):
+    """Devuelve el JSON de hidratación incrustado en la página, o None si no existe"""
+    for script_id in HYDRATION_SCRIPT_IDS:
+        match = re.search(
+            r'<script[^>]*id=["\']' + re.escape(script_id) + r'["\'][^>]*>(.*?)</script>', html, re.DOTALL
+        )
+        if not match:
+            continue
+        try:
+            return json.loads(match.group(1))
+        except ValueError:
+            continue
+    return None
+
+
+def extract_json_ld(html):
+    """Devuelve la lista de bloques JSON-LD válidos de la página, o None si no hay"""
+    json_data = []
+    for block in _JSON_LD_PATTERN.findall(html):
+        try:
+            json_data.append(json.loads(block))
+        except ValueError:
+            continue
+    return json_data if json_data else None
+
+
+def find_item_struct(data, video_id=None):
+    """Localiza los datos del video dentro del JSON de hidratación"""
+    if not isinstance(data, dict):
+        return None
+
+    # Formato actual: __DEFAULT_SCOPE__ -> webapp.video-detail -> itemInfo -> itemStruct
+    detail = data.get('__DEFAULT_SCOPE__', {}).get('webapp.video-detail', {})
+    item = detail.get('itemInfo', {}).get('itemStruct')
+    if item:
+        return item
+
+    # Formato antiguo (SIGI_STATE): ItemModule indexado por ID y autor en UserModule
+    items = data.get('ItemModule') or {}
+    item = items.get(video_id) if video_id else None
+    if item is None and len(items) == 1:
+        item = next(iter(items.values()))
+    if not item:
+        return None
+
+    item = dict(item)
+    author = item.get('author')
+    if isinstance(author, str):
+        item['author'] = data.get('UserModule', {}).get('users', {}).get(author, {'uniqueId': author})
+    return item
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def video_data_from_item_struct(item, video_url, json_ld=None, download_urls=None):
+    """Convierte un itemStruct de TikTok al mismo formato de video_data que el scraper"""
+    author = item.get('author') or {}
+    music = item.get('music') or {}
+    video = item.get('video') or {}
+    stats = item.get('statsV2') or item.get('stats') or {}
+
+    hashtags = [
+        f"#{extra['hashtagName']}" for extra in item.get('textExtra') or [] if extra.get('hashtagName')
+    ]
+    if not hashtags:
+        hashtags = [f"#{challenge['title']}" for challenge in item.get('challenges') or [] if challenge.get('title')]
+
+    music_text = ' - '.join(part for part in [music.get('title'), music.get('authorName')] if part) or None
+
+    width = _to_int(video.get('width'))
+    height = _to_int(video.get('height'))
+
+    create_time = _to_int(item.get('createTime'))
+    publish_time = datetime.fromtimestamp(create_time, tz=timezone.utc).isoformat() if create_time else None
+
+    if download_urls is None:
+        download_urls = {}
+        if video.get('playAddr'):
+            download_urls['pattern_1'] = [clean_download_url(video['playAddr'])]
+        if video.get('downloadAddr'):
+            download_urls['pattern_2'] = [clean_download_url(video['downloadAddr'])]
+
+    metadata = {
+        'publish_time': publish_time,
+        'video_id': item.get('id'),
+    }
+    if json_ld:
+        metadata['json_ld'] = json_ld
+
+    return {
+        'url': video_url,
+        'scraped_at': datetime.now().isoformat(),
+        'basic_info': {
+            'description': item.get('desc') or None,
+            'hashtags': hashtags,
+            'music': music_text,
+        },
+        'engagement': {
+            'likes': _to_int(stats.get('diggCount')),
+            'comments': _to_int(stats.get('commentCount')),
+            'shares': _to_int(stats.get('shareCount')),
+            'views': _to_int(stats.get('playCount')),
+        },
+        'author': {
+            'username': author.get('uniqueId'),
+            'display_name': author.get('nickname'),
+            'avatar_url': author.get('avatarThumb') or author.get('avatarMedium'),
+            'is_verified': bool(author.get('verified')),
+        },
+        'video_details': {
+            'duration': video.get('duration'),
+            'width': width,
+            'height': height,
+            'aspect_ratio': f"{width}:{height}" if width and height else None,
+            'video_src': clean_download_url(video['playAddr']) if video.get('playAddr') else None,
+        },
+        'metadata': metadata,
+        'download_urls': download_urls,
+    }
+
+
+def parse_video_page(html, video_url, video_id=None):
+    """
+    Extrae video_data del HTML de la página de un video sin navegador.
+    Devuelve None si la página no contiene los datos del video (captcha, cambio de formato...).
+    """
+    item = find_item_struct(extract_hydration_json(html), video_id)
+    if not item:
+        return None
+    return video_data_from_item_struct(
+        item, video_url, json_ld=extract_json_ld(html), download_urls=find_download_urls(html) or None
+    )
@@ -0,0 +1,153 @@
+import base64
+import json
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from tiktok_scraping.hydration_parser import video_data_from_item_struct
+
+# Peticiones JSON paginadas con las que la página rellena la cuadrícula de videos
+ITEM_LIST_PATTERNS = (
+    "/api/collection/item_list",
+    "/api/favorite/item_list",
+    "/api/mix/item_list",
+    "/api/post/item_list",
+)
+
+# Descarga una página de la API desde la propia pestaña (mismas cookies que la página)
+FETCH_PAGE_SCRIPT = """
+var done = arguments[arguments.length - 1];
+fetch(arguments[0], {credentials: 'include'})
+    .then(function (r) { return r.text(); })
+    .then(function (text) { done(text); })
+    .catch(function (e) { done(null); });
+"""
+
+
+def item_list_responses(log_entries, patterns=ITEM_LIST_PATTERNS):
+    """
+    Respuestas de la API de listas en las entradas del log de rendimiento de
+    Chrome (driver.get_log("performance")). Devuelve [(requestId, url)] en orden
+    """
+    responses = []
+    for entry in log_entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        if message.get("method") != "Network.responseReceived":
+            continue
+        params = message.get("params", {})
+        url = params.get("response", {}).get("url", "")
+        if any(pattern in url for pattern in patterns):
+            responses.append((params.get("requestId"), url))
+    return responses
+
+
+def parse_item_list(payload):
+    """
+    Items, cursor siguiente y si hay más páginas de una respuesta de la API.
+    Acepta el JSON ya parseado o el texto
+    """
+    if isinstance(payload, (str, bytes)):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            return [], None, False
+    if not isinstance(payload, dict):
+        return [], None, False
+    items = payload.get("itemList") or payload.get("items") or []
+    cursor = payload.get("cursor")
+    has_more = bool(payload.get("hasMore"))
+    return items, cursor, has_more
+
+
+def item_video_url(item):
+    """URL canónica de la página de un video"""
+    username = (item.get("author") or {}).get("uniqueId") or "_"
+    return f"https://www.tiktok.com/@{username}/video/{item['id']}"
+
+
+def items_to_video_data(items):
+    """video_data de cada item, en el mismo formato que guarda TikTokVideoScraper"""
+    return [video_data_from_item_struct(item, item_video_url(item)) for item in items if item.get("id")]
+
+
+def page_key(url):
+    """(ruta, cursor) de una petición de la API: identifica la página que pide"""
+    parts = urlsplit(url)
+    return parts.path, dict(parse_qsl(parts.query)).get("cursor", "0")
+
+
+def with_cursor(url, cursor):
+    """La misma URL de la API pidiendo la página que empieza en cursor"""
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query["cursor"] = str(cursor)
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class ItemListCapture:
+    """
+    Lee las respuestas de la API de listas de una colección a través del log
+    de rendimiento de Chrome y Network.getResponseBody (DevTools), en lugar de
+    volver a leerlas del DOM. El driver tiene que crearse con el log de
+    rendimiento activado (goog:loggingPrefs).
+
+    Cada página se devuelve una sola vez: las que se piden con fetch_page
+    también aparecen en el log, y la propia página puede volver a pedir al
+    hacer scroll un cursor que ya se leyó.
+    """
+
+    def __init__(self, driver, patterns=ITEM_LIST_PATTERNS):
+        self.driver = driver
+        self.patterns = patterns
+        self.last_url = None
+        # Páginas ya devueltas, por (ruta, cursor)
+        self.seen_pages = set()
+        # Páginas pedidas con fetch_page, que la propia página volverá a pedir al hacer scroll
+        self.direct_pages = 0
+        self.driver.execute_cdp_cmd("Network.enable", {})
+
+    def drain(self):
+        """
+        Páginas capturadas desde la última llamada: [(items, cursor, has_more)].
+        Vacía el log de rendimiento
+        """
+        pages = []
+        for request_id, url in item_list_responses(self.driver.get_log("performance"), self.patterns):
+            if page_key(url) in self.seen_pages:
+                continue
+            try:
+                body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            except Exception as e:
+                # El cuerpo ya no está disponible (navegación, caché de DevTools llena...)
+                print(f"No se pudo leer la respuesta de {url}: {e}")
+                continue
+            text = body.get("body", "")
+            if body.get("base64Encoded"):
+                text = base64.b64decode(text)
+            self.last_url = url
+            self.seen_pages.add(page_key(url))
+            pages.append(parse_item_list(text))
+        return pages
+
+    def fetch_page(self, cursor):
+        """
+        Pide directamente la página siguiente repitiendo la última petición
+        capturada con otro cursor. Devuelve None si la API la rechaza (por
+        ejemplo, porque exige firmar cada petición)
+        """
+        if self.last_url is None:
+            return None
+        url = with_cursor(self.last_url, cursor)
+        try:
+            text = self.driver.execute_async_script(FETCH_PAGE_SCRIPT, url)
+        except Exception as e:
+            print(f"Error pidiendo la página con cursor {cursor}: {e}")
+            return None
+        items, next_cursor, has_more = parse_item_list(text or "")
+        if not items:
+            return None
+        # La respuesta también queda en el log; drain() no la tiene que volver a contar
+        self.seen_pages.add(page_key(url))
+        self.direct_pages += 1
+        return items, next_cursor, has_more
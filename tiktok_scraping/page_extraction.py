@@ -0,0 +1,153 @@
+# Script que se inyecta en la página del video para extraer todos los datos en
+# una sola llamada a WebDriver. Recibe como argumento un objeto con las mismas
+# listas de selectores que usan los extractores de TikTokVideoScraper y replica
+# su lógica (primer selector con texto, atributos, <video>, JSON-LD y patrones
+# de URLs). Devuelve los valores en bruto; el parseo de contadores, el ID del
+# video y el JSON-LD se hacen en Python para que el resultado sea idéntico.
+EXTRACTION_SCRIPT = r"""
+var cfg = arguments[0];
+var errors = {};
+
+function firstText(selectors) {
+    for (var i = 0; i < selectors.length; i++) {
+        try {
+            var el = document.querySelector(selectors[i]);
+            if (el) {
+                var text = el.textContent || el.innerText;
+                if (text && text.trim()) {
+                    return text.trim();
+                }
+            }
+        } catch (e) {}
+    }
+    return null;
+}
+
+function attributeOf(el, attr) {
+    // Igual que get_attribute de Selenium: URL resuelta para src/href, propiedad si existe
+    if (attr === 'src' || attr === 'href') {
+        return el.getAttribute(attr) === null ? null : el[attr];
+    }
+    var prop = el[attr];
+    return (prop !== undefined && prop !== null) ? String(prop) : el.getAttribute(attr);
+}
+
+function firstAttribute(selectors, attr) {
+    for (var i = 0; i < selectors.length; i++) {
+        try {
+            var el = document.querySelector(selectors[i]);
+            if (el) {
+                var value = attributeOf(el, attr);
+                if (value) {
+                    return value;
+                }
+            }
+        } catch (e) {}
+    }
+    return null;
+}
+
+function finiteOrNull(value) {
+    return (typeof value === 'number' && isFinite(value)) ? value : null;
+}
+
+var result = {
+    url: location.href,
+    basic_info: {},
+    engagement: {},
+    author: {},
+    video: null,
+    publish_time: null,
+    json_ld: [],
+    download_matches: [],
+    video_srcs: [],
+    errors: errors
+};
+
+try {
+    result.basic_info.description = firstText(cfg.description);
+    var hashtags = [];
+    try {
+        var links = document.querySelectorAll(cfg.hashtag);
+        for (var i = 0; i < links.length; i++) {
+            var text = links[i].textContent || links[i].innerText;
+            if (text && text.indexOf('#') === 0) {
+                hashtags.push(text);
+            }
+        }
+    } catch (e) {
+        hashtags = [];
+    }
+    result.basic_info.hashtags = hashtags;
+    result.basic_info.music = firstText(cfg.music);
+} catch (e) {
+    errors.basic_info = String(e);
+}
+
+try {
+    result.engagement.likes = firstText(cfg.likes);
+    result.engagement.comments = firstText(cfg.comments);
+    result.engagement.shares = firstText(cfg.shares);
+    result.engagement.views = firstText(cfg.views);
+} catch (e) {
+    errors.engagement = String(e);
+}
+
+try {
+    result.author.username = firstText(cfg.username);
+    result.author.display_name = firstText(cfg.display_name);
+    result.author.avatar_url = firstAttribute(cfg.avatar, 'src');
+    result.author.is_verified = document.querySelectorAll(cfg.verified.join(',')).length > 0;
+} catch (e) {
+    errors.author = String(e);
+}
+
+try {
+    var videos = document.getElementsByTagName('video');
+    if (videos.length) {
+        var v = videos[0];
+        result.video = {
+            duration: finiteOrNull(v.duration),
+            width: v.videoWidth,
+            height: v.videoHeight,
+            src: attributeOf(v, 'src')
+        };
+    }
+} catch (e) {
+    errors.video_details = String(e);
+}
+
+try {
+    result.publish_time = firstText(cfg.publish_time);
+    try {
+        var scripts = document.querySelectorAll('script[type="application/ld+json"]');
+        for (var i = 0; i < scripts.length; i++) {
+            result.json_ld.push(scripts[i].innerHTML);
+        }
+    } catch (e) {}
+} catch (e) {
+    errors.metadata = String(e);
+}
+
+try {
+    // Mismo serializado que usa ChromeDriver para page_source
+    var source = new XMLSerializer().serializeToString(document);
+    for (var i = 0; i < cfg.patterns.length; i++) {
+        var regex = new RegExp(cfg.patterns[i], 'g');
+        var matches = [];
+        var match;
+        while ((match = regex.exec(source)) !== null) {
+            matches.push(match[1]);
+        }
+        result.download_matches.push(matches);
+    }
+    var videoElements = document.getElementsByTagName('video');
+    for (var i = 0; i < videoElements.length; i++) {
+        result.video_srcs.push(attributeOf(videoElements[i], 'src'));
+    }
+} catch (e) {
+    errors.download_urls = String(e);
+}
+
+return result;
+"""
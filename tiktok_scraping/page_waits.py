@@ -0,0 +1,108 @@
+import threading
+import time
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+
+class AdaptiveWaiter:
+    """
+    Esperas guiadas por condiciones en lugar de sleeps fijos.
+
+    Cada espera termina en cuanto se cumple la condición o se alcanza el tope
+    de tiempo, y su duración queda registrada por nombre para poder ajustar
+    los topes con datos reales.
+    """
+
+    def __init__(self, timeout=10, poll_frequency=0.2):
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._timeouts = {}
+
+    def wait_for(self, driver, name, condition, timeout=None):
+        """Espera a que condition(driver) sea verdadera. Devuelve False si se agota el tiempo"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=self.poll_frequency).until(condition)
+            ok = True
+        except TimeoutException:
+            ok = False
+        self.record(name, time.perf_counter() - start, timed_out=not ok)
+        return ok
+
+    def record(self, name, seconds, timed_out=False):
+        with self._lock:
+            self._durations.setdefault(name, []).append(seconds)
+            self._timeouts[name] = self._timeouts.get(name, 0) + int(timed_out)
+
+    def stats(self):
+        """Devuelve, por nombre de espera, número, timeouts y percentiles de duración"""
+        with self._lock:
+            durations = {name: sorted(values) for name, values in self._durations.items()}
+            timeouts = dict(self._timeouts)
+
+        stats = {}
+        for name, values in durations.items():
+            stats[name] = {
+                'count': len(values),
+                'timeouts': timeouts.get(name, 0),
+                'mean': sum(values) / len(values),
+                'p50': _percentile(values, 0.5),
+                'p95': _percentile(values, 0.95),
+                'max': values[-1],
+            }
+        return stats
+
+    def print_stats(self):
+        stats = self.stats()
+        if not stats:
+            return
+        print("\n=== ESPERAS ===")
+        for name, s in stats.items():
+            print(f"{name}: n={s['count']} timeouts={s['timeouts']} media={s['mean']:.2f}s "
+                  f"p50={s['p50']:.2f}s p95={s['p95']:.2f}s max={s['max']:.2f}s")
+
+
+def _percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# Condiciones reutilizables para WebDriverWait
+
+def any_selector_present(selectors):
+    """Se cumple cuando existe algún elemento que encaje con alguno de los selectores"""
+    css = ','.join(selectors)
+
+    def condition(driver):
+        try:
+            return len(driver.find_elements(By.CSS_SELECTOR, css)) > 0
+        except WebDriverException:
+            return False
+    return condition
+
+
+def video_metadata_loaded(driver):
+    """Se cumple cuando el primer <video> tiene cargados sus metadatos (duración y dimensiones)"""
+    try:
+        return driver.execute_script(
+            "var v = document.querySelector('video'); return !!v && v.readyState >= 1;"
+        )
+    except WebDriverException:
+        return False
+
+
+def page_grew(previous_anchors, previous_height):
+    """Se cumple cuando tras un scroll aparecen enlaces nuevos o crece la página"""
+    def condition(driver):
+        try:
+            anchors, height = driver.execute_script(
+                "return [document.getElementsByTagName('a').length, document.body.scrollHeight];"
+            )
+        except WebDriverException:
+            return False
+        return anchors > previous_anchors or height > previous_height
+    return condition
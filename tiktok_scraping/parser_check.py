@@ -0,0 +1,166 @@
+import base64
+import json
+import os
+from typing import Callable, List, Tuple
+
+from tiktok_scraping.hydration_parser import parse_video_page
+from tiktok_scraping.item_list_capture import (
+    ItemListCapture, item_list_responses, items_to_video_data, parse_item_list,
+)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def load_json_fixture(name: str):
+    return json.loads(load_fixture(name))
+
+
+class RecordedDriver:
+    """
+    Driver stand-in that replays the recorded performance log and item_list
+    bodies. A direct fetch from the page adds its own log entry, like Chrome does.
+    """
+
+    def __init__(self, log_entries, bodies):
+        self.log = list(log_entries)
+        self.bodies = bodies
+        self.body_requests = []
+        self.replays = 0
+
+    def execute_cdp_cmd(self, command, params):
+        if command == "Network.getResponseBody":
+            self.body_requests.append(params["requestId"])
+            body = self.bodies[params["requestId"]]
+            # One body comes base64 encoded, as Chrome does for some responses
+            if params["requestId"].endswith("1"):
+                return {"body": base64.b64encode(body.encode("utf-8")).decode("ascii"), "base64Encoded": True}
+            return {"body": body, "base64Encoded": False}
+        return {}
+
+    def get_log(self, log_type):
+        entries, self.log = self.log, []
+        return entries
+
+    def execute_async_script(self, script, url):
+        cursor = dict(part.split("=", 1) for part in url.split("?", 1)[1].split("&"))["cursor"]
+        self.replays += 1
+        request_id = f"2000.{self.replays}"
+        self.bodies[request_id] = load_fixture(f"item_list_cursor_{cursor}.json")
+        self.log.append({"level": "INFO", "timestamp": 0, "message": json.dumps({"message": {
+            "method": "Network.responseReceived",
+            "params": {"requestId": request_id, "type": "Fetch", "response": {"url": url, "status": 200}},
+        }})})
+        return self.bodies[request_id]
+
+
+def check_item_list_responses() -> str:
+    log = load_json_fixture("performance_log_collection.json")
+    responses = item_list_responses(log)
+    assert [request_id for request_id, _ in responses] == ["1000.41", "1000.57", "1000.63"], \
+        f"unexpected responses: {responses}"
+    assert all("/api/collection/item_list/" in url for _, url in responses), "non item_list response picked"
+    return f"{len(responses)} item_list responses out of {len(log)} log entries"
+
+
+def check_parse_item_list() -> str:
+    text = load_fixture("item_list_cursor_0.json")
+    items, cursor, has_more = parse_item_list(text)
+    assert len(items) == 2 and cursor == "30" and has_more, f"page 0 parsed as {len(items)}, {cursor}, {has_more}"
+    assert parse_item_list(text.encode("utf-8"))[1] == "30", "bytes payload not parsed"
+    assert parse_item_list(json.loads(load_fixture("item_list_cursor_30.json")))[1:] == ("60", False), \
+        "last page parsed wrong"
+    for broken in ("", "{truncated", "[]", b"\xff"):
+        assert parse_item_list(broken) == ([], None, False), f"{broken!r} not rejected"
+
+    videos = items_to_video_data(items)
+    first, second = videos
+    assert first["url"] == "https://www.tiktok.com/@barpepe_madrid/video/7412345678901234567", first["url"]
+    assert first["basic_info"]["hashtags"] == ["#tapas", "#madrid"], first["basic_info"]["hashtags"]
+    assert first["engagement"]["views"] == 154300 and first["video_details"]["duration"] == 31
+    # statsV2 comes as strings
+    assert second["engagement"]["likes"] == 6100, second["engagement"]
+    assert first["metadata"]["publish_time"].startswith("2024-09-10"), first["metadata"]["publish_time"]
+    return f"{len(items)} items, cursor {cursor}, video_data for {len(videos)} videos"
+
+
+def check_capture_pages() -> str:
+    bodies = {
+        "1000.41": load_fixture("item_list_cursor_0.json"),
+        "1000.57": load_fixture("item_list_cursor_30.json"),
+        "1000.63": load_fixture("item_list_cursor_30.json"),
+    }
+    log = load_json_fixture("performance_log_collection.json")
+    # The page loaded only the first page so far
+    driver = RecordedDriver([entry for entry in log if "cursor=30" not in entry["message"]], bodies)
+    capture = ItemListCapture(driver)
+
+    pages = capture.drain()
+    assert [cursor for _, cursor, _ in pages] == ["30"], f"first drain gave {pages}"
+    direct = capture.fetch_page("30")
+    assert direct is not None and direct[1] == "60", "direct fetch failed"
+
+    # After the direct fetch the page scrolls and asks for cursor=30 itself: neither the replayed
+    # response nor the page's own request may come back as a new page
+    driver.log.extend(entry for entry in log if "cursor=30" in entry["message"])
+    pages = capture.drain()
+    assert pages == [], f"{len(pages)} already read pages returned again"
+    assert capture.direct_pages == 1, f"{capture.direct_pages} direct pages counted"
+    assert driver.body_requests == ["1000.41"], f"bodies read: {driver.body_requests}"
+    return "2 pages read once; replayed and repeated responses skipped without reading their bodies"
+
+
+def check_video_pages() -> str:
+    # Current format: __UNIVERSAL_DATA_FOR_REHYDRATION__, with escaped slashes and a broken JSON-LD block
+    url = "https://www.tiktok.com/@barpepe_madrid/video/7412345678901234567"
+    data = parse_video_page(load_fixture("video_page_rehydration.html"), url, "7412345678901234567")
+    assert data is not None, "current page format not parsed"
+    assert data["url"] == url and data["metadata"]["video_id"] == "7412345678901234567"
+    assert data["author"]["username"] == "barpepe_madrid" and data["author"]["is_verified"], data["author"]
+    assert data["engagement"] == {"likes": 12040, "comments": 310, "shares": 95, "views": 154300}, data["engagement"]
+    assert data["basic_info"]["hashtags"] == ["#tapas", "#madrid"], data["basic_info"]["hashtags"]
+    assert data["video_details"]["aspect_ratio"] == "576:1024", data["video_details"]
+    assert all("\\" not in u and "u002F" not in u for urls in data["download_urls"].values() for u in urls), \
+        f"download URLs not cleaned: {data['download_urls']}"
+    assert len(data["metadata"]["json_ld"]) == 1, "broken JSON-LD block not skipped"
+
+    # Old format: SIGI_STATE, with the author in UserModule and hashtags as challenges
+    url = "https://www.tiktok.com/@viajes.lucia/video/7012345678901234567"
+    old = parse_video_page(load_fixture("video_page_sigi_state.html"), url, "7012345678901234567")
+    assert old is not None, "SIGI_STATE page not parsed"
+    assert old["author"]["display_name"] == "Lucía viaja", old["author"]
+    assert old["basic_info"]["hashtags"] == ["#barcelona"], old["basic_info"]["hashtags"]
+    assert old["metadata"]["publish_time"].startswith("2021-09-30"), old["metadata"]["publish_time"]
+
+    # Verification page: no video data, so the scraper falls back to the browser
+    assert parse_video_page(load_fixture("video_page_captcha.html"), url, "7012345678901234567") is None, \
+        "captcha page parsed as a video"
+    return "current and SIGI_STATE pages parsed, captcha page rejected"
+
+
+def run_checks() -> List[Tuple[str, bool, str]]:
+    checks: List[Tuple[str, Callable]] = [
+        ("item_list responses", check_item_list_responses),
+        ("parse item_list", check_parse_item_list),
+        ("capture pages", check_capture_pages),
+        ("video pages", check_video_pages),
+    ]
+    results = []
+    for name, check in checks:
+        try:
+            results.append((name, True, check()))
+        except AssertionError as e:
+            results.append((name, False, str(e)))
+    return results
+
+
+if __name__ == "__main__":
+    results = run_checks()
+    for name, ok, detail in results:
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<20} {detail}")
+    if not all(ok for _, ok, _ in results):
+        raise SystemExit(1)
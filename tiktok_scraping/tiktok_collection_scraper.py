@@ -1,79 +1,87 @@
 import time
 import re
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import json
+import os
+from tiktok_scraping.browser_pool import BrowserPool
+from tiktok_scraping.page_waits import AdaptiveWaiter, any_selector_present, page_grew
+from tiktok_scraping.item_list_capture import ItemListCapture, items_to_video_data
+from tiktok_scraping.tiktok_video_scraper import TikTokVideoScraper
+
+# Enlaces candidatos a video; el filtro definitivo lo hace is_tiktok_video_url
+VIDEO_LINK_SELECTOR = 'a[href*="/video/"], a[href*="vm.tiktok.com/"], a[href*="tiktok.com/t/"]'
+
+# Recoge los enlaces visibles y, si arguments[1] es true, hace scroll: una sola llamada
+# por scroll. Se recogen antes de hacer scroll porque la lista virtualizada de TikTok
+# quita del DOM los videos que quedan muy arriba
+HARVEST_SCRIPT = """
+var hrefs = Array.prototype.map.call(document.querySelectorAll(arguments[0]), function (a) { return a.href; });
+var anchors = document.getElementsByTagName('a').length;
+if (arguments[1]) { window.scrollTo(0, document.body.scrollHeight); }
+return [hrefs, anchors, document.body.scrollHeight];
+"""
 
 class TikTokCollectionScraper:
-    def __init__(self, headless=True):
-        self.setup_driver(headless)
-        
-    def setup_driver(self, headless):
-        """Configura el driver de Chrome"""
-        chrome_options = Options()
-        if headless:
-            chrome_options.add_argument("--headless")
-        
-        # Opciones para evitar detección
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # User agent para parecer un navegador real
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        
-        self.driver = webdriver.Chrome(executable_path = 'C://chromedriver-win64//chromedriver.exe', options=chrome_options)
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        
-    def scroll_to_load_more(self, pause_time=2, max_scrolls=20):
-        """Hace scroll para cargar más videos"""
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
-        scrolls = 0
+    def __init__(self, headless=True, wait_timeout=10, capture_api=False, browser_pool=None):
+        # capture_api: leer los videos de las respuestas de la API de la colección en lugar del DOM
+        self.capture_api = capture_api
+        # Sin pool compartido, el scraper usa uno propio de un navegador
+        self._owns_pool = browser_pool is None
+        self.browser_pool = browser_pool or BrowserPool(size=1, headless=headless, warm=False)
+        # El navegador se queda prestado mientras dura el scraping de la colección; solo
+        # este necesita el log de rendimiento (para capturar las respuestas de la API)
+        self._lease = self.browser_pool.acquire(performance_log=capture_api)
+        self.driver = self._lease.driver
+        self.waiter = AdaptiveWaiter(timeout=wait_timeout)
         
-        while scrolls < max_scrolls:
-            # Scroll hacia abajo
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(pause_time)
-            
-            # Calcula nueva altura
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
-            
-            if new_height == last_height:
-                print(f"No hay más contenido que cargar después de {scrolls} scrolls")
+    def harvest(self, scroll=False):
+        """Devuelve los hrefs de los enlaces a videos que hay ahora en la página (y opcionalmente hace scroll)"""
+        hrefs, anchors, height = self.driver.execute_script(HARVEST_SCRIPT, VIDEO_LINK_SELECTOR, scroll)
+        return [href for href in hrefs if href and self.is_tiktok_video_url(href)], anchors, height
+
+    def iter_video_urls(self, pause_time=2, max_scrolls=20, idle_scrolls=2):
+        """
+        Hace scroll y va devolviendo las URLs nuevas en cuanto aparecen.
+        Para cuando idle_scrolls scrolls seguidos no aportan URLs nuevas
+        (o al llegar a max_scrolls). pause_time es el tope de espera por scroll
+        """
+        seen = set()
+        idle = 0
+        for scroll in range(max_scrolls + 1):
+            # En la última vuelta solo se recoge, sin hacer más scroll
+            urls, last_anchors, last_height = self.harvest(scroll=scroll < max_scrolls)
+            new_urls = [url for url in dict.fromkeys(urls) if url not in seen]
+            seen.update(new_urls)
+            yield from new_urls
+
+            idle = 0 if new_urls else idle + 1
+            if idle >= idle_scrolls:
+                print(f"Sin URLs nuevas en {idle_scrolls} scrolls seguidos; fin tras {scroll} scrolls ({len(seen)} URLs)")
+                return
+            if scroll == max_scrolls:
                 break
-                
-            last_height = new_height
-            scrolls += 1
-            print(f"Scroll {scrolls}/{max_scrolls} completado")
-            
+            print(f"Scroll {scroll + 1}/{max_scrolls}: {len(new_urls)} URLs nuevas ({len(seen)} en total)")
+
+            # Espera hasta que aparezcan enlaces nuevos o crezca la página
+            self.waiter.wait_for(self.driver, 'collection_scroll', page_grew(last_anchors, last_height), timeout=pause_time)
+
     def extract_video_urls(self):
-        """Extrae las URLs de los videos de la colección"""
-        video_urls = set()
-        
+        """Extrae las URLs de los videos que hay ahora en la página"""
         try:
             # Espera a que carguen los elementos de video
             WebDriverWait(self.driver, 10).until(
                 EC.presence_of_element_located((By.TAG_NAME, "a"))
             )
-            
-            # Busca todos los enlaces que contengan patrones de TikTok
-            links = self.driver.find_elements(By.TAG_NAME, "a")
-            
-            for link in links:
-                href = link.get_attribute("href")
-                if href and self.is_tiktok_video_url(href):
-                    video_urls.add(href)
-                    
         except TimeoutException:
             print("Timeout esperando a que carguen los videos")
-            
-        return list(video_urls)
+            return []
+
+        # Todos los enlaces en una sola llamada en lugar de una por enlace
+        urls, _, _ = self.harvest()
+        return list(dict.fromkeys(urls))
     
     def is_tiktok_video_url(self, url):
         """Verifica si la URL es de un video de TikTok"""
@@ -88,28 +96,103 @@ class TikTokCollectionScraper:
                 return True
         return False
     
+    def iter_collection_items(self, collection_url, max_pages=100, max_scrolls=100, pause_time=4, idle_scrolls=2):
+        """
+        Devuelve el video_data de cada video de la colección leyendo las
+        respuestas paginadas de su API (requiere capture_api=True).
+
+        Tras la primera página se intenta pedir directamente la siguiente con
+        su cursor; si la API no lo acepta, se hace scroll para que la pida la
+        propia página y se captura la respuesta. Para tras idle_scrolls scrolls
+        seguidos sin páginas nuevas o al llegar a max_scrolls.
+        """
+        capture = ItemListCapture(self.driver)
+        print(f"Iniciando scraping (API) de: {collection_url}")
+        self.driver.get(collection_url)
+        self.waiter.wait_for(self.driver, 'collection_load', any_selector_present(['a[href*="/video/"]']))
+
+        seen = set()
+        pending = capture.drain()
+        cursor, has_more, direct, idle, pages, scrolls = None, True, True, 0, 0, 0
+        while pages < max_pages:
+            if not pending:
+                if not has_more:
+                    break
+                page = capture.fetch_page(cursor) if direct and cursor is not None else None
+                if page is not None:
+                    pending = [page]
+                else:
+                    # Sin petición directa (la API pide firma): la página la hace al hacer scroll
+                    direct = False
+                    if scrolls >= max_scrolls:
+                        print(f"Límite de {max_scrolls} scrolls alcanzado")
+                        break
+                    scrolls += 1
+                    _, last_anchors, last_height = self.harvest(scroll=True)
+                    self.waiter.wait_for(self.driver, 'collection_api_page',
+                                         page_grew(last_anchors, last_height), timeout=pause_time)
+                    pending = capture.drain()
+                    if not pending:
+                        idle += 1
+                        # La página vuelve a pedir primero los cursores que ya se leyeron con
+                        # fetch_page: se le da un scroll de margen por cada uno
+                        if idle >= idle_scrolls + capture.direct_pages:
+                            print(f"Sin páginas nuevas de la API en {idle} scrolls seguidos")
+                            break
+                        continue
+            idle = 0
+            items, cursor, has_more = pending.pop(0)
+            pages += 1
+            new = [data for data in items_to_video_data(items) if data['metadata']['video_id'] not in seen]
+            seen.update(data['metadata']['video_id'] for data in new)
+            print(f"Página {pages} de la API: {len(new)} videos nuevos ({len(seen)} en total)")
+            yield from new
+
+    @staticmethod
+    def save_video_data(video_data):
+        """
+        Guarda el video_data de un item de la API donde lo busca
+        TikTokVideoScraper, para que no tenga que volver a abrir la página
+        """
+        path = TikTokVideoScraper.data_path(video_data['metadata']['video_id'])
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(video_data, f, indent=2, ensure_ascii=False)
+
+    def iter_collection(self, collection_url, max_scrolls=10):
+        """
+        Abre la colección y va devolviendo las URLs de los videos según se
+        recogen al hacer scroll, para que las etapas siguientes puedan empezar
+        antes de terminar. Con capture_api las URLs salen de la API y los
+        datos de cada video se guardan por el camino
+        """
+        if self.capture_api:
+            for video_data in self.iter_collection_items(collection_url):
+                self.save_video_data(video_data)
+                yield video_data['url']
+            return
+
+        print(f"Iniciando scraping de: {collection_url}")
+        self.driver.get(collection_url)
+        # Espera inicial hasta que aparezca algún enlace a un video
+        self.waiter.wait_for(self.driver, 'collection_load', any_selector_present(['a[href*="/video/"]']))
+
+        print("Haciendo scroll y recogiendo URLs de videos...")
+        yield from self.iter_video_urls(max_scrolls=max_scrolls, pause_time=4)
+
     def scrape_collection(self, collection_url, max_scrolls=10):
         """Función principal para hacer scraping de una colección"""
-        print(f"Iniciando scraping de: {collection_url}")
-        
+        urls = []
         try:
-            self.driver.get(collection_url)
-            time.sleep(5)  # Espera inicial para que cargue la página
-            
-            # Hacer scroll para cargar más contenido
-            print("Haciendo scroll para cargar más videos...")
-            self.scroll_to_load_more(max_scrolls=max_scrolls, pause_time=4)
-            
-            # Extraer URLs
-            print("Extrayendo URLs de videos...")
-            urls = self.extract_video_urls()
-            
-            print(f"Se encontraron {len(urls)} URLs de videos")
-            return urls
-            
+            for url in self.iter_collection(collection_url, max_scrolls=max_scrolls):
+                urls.append(url)
         except Exception as e:
             print(f"Error durante el scraping: {str(e)}")
-            return []
+
+        print(f"Se encontraron {len(urls)} URLs de videos")
+        return urls
     
     def save_urls(self, urls, filename="tiktok_urls.json"):
         """Guarda las URLs en un archivo JSON"""
@@ -125,5 +208,10 @@ class TikTokCollectionScraper:
         print(f"URLs guardadas en {filename}")
     
     def close(self):
-        """Cierra el driver"""
-        self.driver.quit()
\ No newline at end of file
+        """Devuelve el driver al pool (y cierra el pool si es propio)"""
+        self.waiter.print_stats()
+        if self._lease is not None:
+            self.browser_pool.release(self._lease)
+            self._lease = None
+        if self._owns_pool:
+            self.browser_pool.close()
\ No newline at end of file
@@ -1,42 +1,120 @@
 import yt_dlp
 import time
 import json
-import re
 import requests
 import os
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from urllib.parse import urlparse, parse_qs
+from tiktok_scraping.browser_pool import BrowserPool
+from tiktok_scraping.video_ids import extract_video_id_from_url, is_short_link
+from tiktok_scraping.page_waits import AdaptiveWaiter, any_selector_present, video_metadata_loaded
+from tiktok_scraping.page_extraction import EXTRACTION_SCRIPT
+from tiktok_scraping.hydration_parser import DOWNLOAD_URL_PATTERNS, clean_download_url, find_download_urls, parse_video_page
+
+# Carpetas de salida. Todos los ficheros de un video se nombran con su ID de TikTok
+DATA_FOLDER = "data"
+VIDEOS_FOLDER = "downloads"
+
+# Selectores del título/descripción del video
+DESCRIPTION_SELECTORS = [
+    '[data-e2e="browse-video-desc"]',
+    '[data-e2e="video-desc"]',
+    'h1[data-e2e="browse-video-desc"]',
+    '.tiktok-j2a19a-SpanText'
+]
+
+# Música/sonido
+MUSIC_SELECTORS = [
+    '[data-e2e="browse-music"]',
+    '[data-e2e="video-music"]',
+    '.tiktok-kdeneb-SpanText'
+]
+
+# Engagement
+LIKE_SELECTORS = [
+    '[data-e2e="like-count"]',
+    '[data-e2e="browse-like-count"]',
+    '.tiktok-1bs0hyz-SpanText'
+]
+COMMENT_SELECTORS = [
+    '[data-e2e="comment-count"]',
+    '[data-e2e="browse-comment-count"]'
+]
+SHARE_SELECTORS = [
+    '[data-e2e="share-count"]',
+    '[data-e2e="browse-share-count"]'
+]
+VIEW_SELECTORS = [
+    '[data-e2e="video-views"]',
+    '.video-count'
+]
+
+# Autor
+USERNAME_SELECTORS = [
+    '[data-e2e="browse-username"]',
+    '[data-e2e="video-username"]',
+    '.tiktok-1w9r2es-SpanUniqueId'
+]
+DISPLAY_NAME_SELECTORS = [
+    '[data-e2e="browse-user-displayname"]',
+    '.tiktok-qi72ht-SpanNickName'
+]
+AVATAR_SELECTORS = [
+    '[data-e2e="browse-user-avatar"] img',
+    '.tiktok-1zpj2q-ImgAvatar'
+]
+VERIFIED_SELECTORS = [
+    '[data-e2e="browse-user-verified"]',
+    '.tiktok-1443suu-DivWrapper'
+]
+
+# Fecha de publicación
+PUBLISH_TIME_SELECTORS = [
+    '[data-e2e="browser-nickname"] + div',
+    '.tiktok-1ed61qv-SpanText'
+]
+
+# Hashtags dentro de la descripción
+HASHTAG_SELECTOR = '[data-e2e="browse-video-desc"] a, [data-e2e="video-desc"] a'
+
+# Modos de extracción: un único script inyectado o una llamada WebDriver por selector
+EXTRACTION_MODES = ("script", "webdriver")
 
 class TikTokVideoScraper:
-    def __init__(self, headless=True):
-        self.setup_driver(headless)
+    def __init__(self, headless=True, wait_timeout=10, metadata_wait_timeout=3, extraction_mode="script",
+                 fast_path=True, http_timeout=15, browser_pool=None):
+        if extraction_mode not in EXTRACTION_MODES:
+            raise ValueError(f"Modo de extracción no válido. Valores posibles: {EXTRACTION_MODES}")
+        self.extraction_mode = extraction_mode
+        # Chrome solo se pide al pool si el camino rápido (JSON de la página) no es suficiente.
+        # Sin pool compartido, el scraper usa uno propio de un navegador que arranca al necesitarlo
+        self.headless = headless
+        self._owns_pool = browser_pool is None
+        self.browser_pool = browser_pool or BrowserPool(size=1, headless=headless, warm=False)
+        self._driver = None
+        self._lease = None
+        self.fast_path = fast_path
+        self.http_timeout = http_timeout
+        # Esperas adaptativas: tope para la descripción y, más corto, para los metadatos del <video>
+        self.waiter = AdaptiveWaiter(timeout=wait_timeout)
+        self.metadata_wait_timeout = metadata_wait_timeout
         self.session = requests.Session()
         self.setup_session()
         
-    def setup_driver(self, headless):
-        """Configura el driver de Chrome"""
-        chrome_options = Options()
-        if headless:
-            chrome_options.add_argument("--headless")
-        
-        # Opciones para evitar detección
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # User agent realista
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        
-        self.driver = webdriver.Chrome(executable_path = 'C://chromedriver-win64//chromedriver.exe', options=chrome_options)
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    @property
+    def driver(self):
+        """
+        Driver de Chrome. Durante extract_video_data es el prestado por el pool
+        para esa página; fuera de ella se pide uno que se devuelve en close()
+        """
+        if self._driver is None:
+            self._lease = self.browser_pool.acquire()
+            self._driver = self._lease.driver
+        return self._driver
         
     def setup_session(self):
         """Configura la sesión de requests"""
@@ -53,41 +131,205 @@ class TikTokVideoScraper:
         """Extrae toda la información del video de TikTok"""
         print(f"Procesando video: {video_url}")
         
+        if self.fast_path:
+            video_data = self.extract_video_data_fast(video_url)
+            if video_data is not None:
+                return video_data
+            print("JSON de la página no disponible, usando Selenium")
+        
+        if self._lease is not None:
+            # Ya tiene un driver prestado hasta close()
+            return self.extract_video_data_with_driver(video_url)
+        try:
+            # Un navegador del pool solo para esta página
+            with self.browser_pool.lease() as driver:
+                self._driver = driver
+                try:
+                    return self.extract_video_data_with_driver(video_url)
+                finally:
+                    self._driver = None
+        except Exception as e:
+            print(f"Error extrayendo datos del video: {str(e)}")
+            return None
+    
+    def extract_video_data_with_driver(self, video_url):
+        """Extrae los datos abriendo la página en Chrome"""
         try:
+            start = time.perf_counter()
             self.driver.get(video_url)
-            time.sleep(5)  # Espera a que cargue completamente
-            
-            video_data = {
-                'url': video_url,
-                'scraped_at': datetime.now().isoformat(),
-                'basic_info': self.extract_basic_info(),
-                'engagement': self.extract_engagement_data(),
-                'author': self.extract_author_info(),
-                'video_details': self.extract_video_details(),
-                'metadata': self.extract_metadata(),
-                'download_urls': self.extract_download_urls()
-            }
-            
+            self.waiter.record('page_load', time.perf_counter() - start)
+            self.wait_until_ready()
+            
+            video_data = None
+            if self.extraction_mode == "script":
+                video_data = self.extract_video_data_in_page(video_url)
+            if video_data is None:
+                video_data = self.extract_video_data_from_dom(video_url)
+            
+            if self.browser_pool.lean:
+                self.fill_video_details_from_page(video_data, video_url)
+            self.browser_pool.measure_page(self.driver)
             return video_data
             
         except Exception as e:
             print(f"Error extrayendo datos del video: {str(e)}")
             return None
     
+    def extract_video_data_from_dom(self, video_url):
+        """Extrae los datos con una llamada WebDriver por selector"""
+        return {
+            'url': video_url,
+            'scraped_at': datetime.now().isoformat(),
+            'basic_info': self.extract_basic_info(),
+            'engagement': self.extract_engagement_data(),
+            'author': self.extract_author_info(),
+            'video_details': self.extract_video_details(),
+            'metadata': self.extract_metadata(),
+            'download_urls': self.extract_download_urls()
+        }
+    
+    def fill_video_details_from_page(self, video_data, video_url):
+        """
+        Con el perfil ligero el <video> no descarga nada y no tiene duración ni
+        dimensiones: se completan con el JSON de hidratación de la página
+        """
+        video_details = video_data.setdefault('video_details', {})
+        if video_details.get('duration') and video_details.get('width'):
+            return
+        try:
+            page_data = parse_video_page(self.driver.page_source, video_url, self.extract_video_id_from_url(video_url))
+        except Exception as e:
+            print(f"Error parseando el JSON de la página: {str(e)}")
+            return
+        if page_data is None:
+            return
+        for key, value in page_data['video_details'].items():
+            if not video_details.get(key):
+                video_details[key] = value
+    
+    def extract_video_data_fast(self, video_url):
+        """Extrae los datos del JSON de hidratación de la página sin arrancar Chrome"""
+        try:
+            response = self.session.get(video_url, timeout=self.http_timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Error descargando la página del video: {str(e)}")
+            return None
+        
+        video_id = self.extract_video_id_from_url(response.url) or self.extract_video_id_from_url(video_url)
+        try:
+            return parse_video_page(response.text, video_url, video_id)
+        except Exception as e:
+            print(f"Error parseando el JSON de la página: {str(e)}")
+            return None
+    
+    def wait_until_ready(self):
+        """
+        Espera a que aparezca la descripción y a que el <video> tenga metadatos.
+        Con el perfil ligero el video está bloqueado y no se espera a sus metadatos
+        """
+        self.waiter.wait_for(self.driver, 'video_description', any_selector_present(DESCRIPTION_SELECTORS))
+        if not self.browser_pool.lean:
+            self.waiter.wait_for(self.driver, 'video_metadata', video_metadata_loaded,
+                                 timeout=self.metadata_wait_timeout)
+
+    def extract_video_data_in_page(self, video_url):
+        """Extrae todos los datos con un único script inyectado. Devuelve None si el script falla"""
+        scraped_at = datetime.now().isoformat()
+        config = {
+            'description': DESCRIPTION_SELECTORS,
+            'hashtag': HASHTAG_SELECTOR,
+            'music': MUSIC_SELECTORS,
+            'likes': LIKE_SELECTORS,
+            'comments': COMMENT_SELECTORS,
+            'shares': SHARE_SELECTORS,
+            'views': VIEW_SELECTORS,
+            'username': USERNAME_SELECTORS,
+            'display_name': DISPLAY_NAME_SELECTORS,
+            'avatar': AVATAR_SELECTORS,
+            'verified': VERIFIED_SELECTORS,
+            'publish_time': PUBLISH_TIME_SELECTORS,
+            'patterns': DOWNLOAD_URL_PATTERNS,
+        }
+        try:
+            raw = self.driver.execute_script(EXTRACTION_SCRIPT, config)
+        except WebDriverException as e:
+            print(f"Error en el script de extracción, usando extractores individuales: {str(e)}")
+            return None
+        if not isinstance(raw, dict):
+            print("El script de extracción no devolvió datos, usando extractores individuales")
+            return None
+        try:
+            return self.video_data_from_script(raw, video_url, scraped_at)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            print(f"Resultado del script de extracción incompleto, usando extractores individuales: {str(e)}")
+            return None
+    
+    def video_data_from_script(self, raw, video_url, scraped_at):
+        """Convierte el resultado del script de extracción al formato de extract_video_data_from_dom"""
+        error_messages = {
+            'basic_info': "Error extrayendo información básica",
+            'engagement': "Error extrayendo datos de engagement",
+            'author': "Error extrayendo información del autor",
+            'video_details': "Error extrayendo detalles del video",
+            'metadata': "Error extrayendo metadatos",
+            'download_urls': "Error extrayendo URLs de descarga",
+        }
+        for section, error in raw.get('errors', {}).items():
+            print(f"{error_messages.get(section, section)}: {error}")
+        
+        # Engagement: los contadores se convierten igual que en extract_engagement_data
+        engagement = {key: self.parse_count(value) for key, value in raw['engagement'].items()}
+        
+        video_details = {}
+        if raw['video']:
+            video_width = raw['video']['width']
+            video_height = raw['video']['height']
+            video_details['duration'] = raw['video']['duration']
+            video_details['width'] = video_width
+            video_details['height'] = video_height
+            video_details['aspect_ratio'] = f"{video_width}:{video_height}" if video_width and video_height else None
+            video_details['video_src'] = raw['video']['src']
+        
+        metadata = {}
+        if 'metadata' not in raw.get('errors', {}):
+            metadata['publish_time'] = raw['publish_time']
+            metadata['video_id'] = self.extract_video_id_from_url(raw['url'])
+            json_ld_data = []
+            for script in raw['json_ld']:
+                try:
+                    json_ld_data.append(json.loads(script))
+                except:
+                    continue
+            if json_ld_data:
+                metadata['json_ld'] = json_ld_data
+        
+        download_urls = {}
+        for i, matches in enumerate(raw['download_matches']):
+            if matches:
+                download_urls[f'pattern_{i+1}'] = [clean_download_url(url) for url in matches]
+        for i, src in enumerate(raw['video_srcs']):
+            if src:
+                download_urls[f'video_element_{i+1}'] = src
+        
+        return {
+            'url': video_url,
+            'scraped_at': scraped_at,
+            'basic_info': raw['basic_info'],
+            'engagement': engagement,
+            'author': raw['author'],
+            'video_details': video_details,
+            'metadata': metadata,
+            'download_urls': download_urls
+        }
+    
     def extract_basic_info(self):
         """Extrae información básica del video"""
         basic_info = {}
         
         try:
             # Título/descripción del video
-            selectors = [
-                '[data-e2e="browse-video-desc"]',
-                '[data-e2e="video-desc"]',
-                'h1[data-e2e="browse-video-desc"]',
-                '.tiktok-j2a19a-SpanText'
-            ]
-            
-            description = self.find_text_by_selectors(selectors)
+            description = self.find_text_by_selectors(DESCRIPTION_SELECTORS)
             basic_info['description'] = description
             
             # Hashtags
@@ -95,13 +337,7 @@ class TikTokVideoScraper:
             basic_info['hashtags'] = hashtags
             
             # Música/sonido
-            music_selectors = [
-                '[data-e2e="browse-music"]',
-                '[data-e2e="video-music"]',
-                '.tiktok-kdeneb-SpanText'
-            ]
-            
-            music = self.find_text_by_selectors(music_selectors)
+            music = self.find_text_by_selectors(MUSIC_SELECTORS)
             basic_info['music'] = music
             
         except Exception as e:
@@ -115,36 +351,19 @@ class TikTokVideoScraper:
         
         try:
             # Likes
-            like_selectors = [
-                '[data-e2e="like-count"]',
-                '[data-e2e="browse-like-count"]',
-                '.tiktok-1bs0hyz-SpanText'
-            ]
-            likes = self.find_text_by_selectors(like_selectors)
+            likes = self.find_text_by_selectors(LIKE_SELECTORS)
             engagement['likes'] = self.parse_count(likes)
             
             # Comentarios
-            comment_selectors = [
-                '[data-e2e="comment-count"]',
-                '[data-e2e="browse-comment-count"]'
-            ]
-            comments = self.find_text_by_selectors(comment_selectors)
+            comments = self.find_text_by_selectors(COMMENT_SELECTORS)
             engagement['comments'] = self.parse_count(comments)
             
             # Shares
-            share_selectors = [
-                '[data-e2e="share-count"]',
-                '[data-e2e="browse-share-count"]'
-            ]
-            shares = self.find_text_by_selectors(share_selectors)
+            shares = self.find_text_by_selectors(SHARE_SELECTORS)
             engagement['shares'] = self.parse_count(shares)
             
             # Vistas (si está disponible)
-            view_selectors = [
-                '[data-e2e="video-views"]',
-                '.video-count'
-            ]
-            views = self.find_text_by_selectors(view_selectors)
+            views = self.find_text_by_selectors(VIEW_SELECTORS)
             engagement['views'] = self.parse_count(views)
             
         except Exception as e:
@@ -158,36 +377,19 @@ class TikTokVideoScraper:
         
         try:
             # Nombre de usuario
-            username_selectors = [
-                '[data-e2e="browse-username"]',
-                '[data-e2e="video-username"]',
-                '.tiktok-1w9r2es-SpanUniqueId'
-            ]
-            username = self.find_text_by_selectors(username_selectors)
+            username = self.find_text_by_selectors(USERNAME_SELECTORS)
             author_info['username'] = username
             
             # Nombre mostrado
-            display_name_selectors = [
-                '[data-e2e="browse-user-displayname"]',
-                '.tiktok-qi72ht-SpanNickName'
-            ]
-            display_name = self.find_text_by_selectors(display_name_selectors)
+            display_name = self.find_text_by_selectors(DISPLAY_NAME_SELECTORS)
             author_info['display_name'] = display_name
             
             # Avatar/foto de perfil
-            avatar_selectors = [
-                '[data-e2e="browse-user-avatar"] img',
-                '.tiktok-1zpj2q-ImgAvatar'
-            ]
-            avatar_url = self.find_attribute_by_selectors(avatar_selectors, 'src')
+            avatar_url = self.find_attribute_by_selectors(AVATAR_SELECTORS, 'src')
             author_info['avatar_url'] = avatar_url
             
             # Verificación
-            verified_selectors = [
-                '[data-e2e="browse-user-verified"]',
-                '.tiktok-1443suu-DivWrapper'
-            ]
-            is_verified = len(self.driver.find_elements(By.CSS_SELECTOR, ','.join(verified_selectors))) > 0
+            is_verified = len(self.driver.find_elements(By.CSS_SELECTOR, ','.join(VERIFIED_SELECTORS))) > 0
             author_info['is_verified'] = is_verified
             
         except Exception as e:
@@ -232,11 +434,7 @@ class TikTokVideoScraper:
         
         try:
             # Fecha de publicación (si está disponible)
-            time_selectors = [
-                '[data-e2e="browser-nickname"] + div',
-                '.tiktok-1ed61qv-SpanText'
-            ]
-            publish_time = self.find_text_by_selectors(time_selectors)
+            publish_time = self.find_text_by_selectors(PUBLISH_TIME_SELECTORS)
             metadata['publish_time'] = publish_time
             
             # ID del video (extraer de la URL)
@@ -261,20 +459,7 @@ class TikTokVideoScraper:
             # Buscar en el código fuente patrones de URLs de video
             page_source = self.driver.page_source
             
-            # Patrones comunes para URLs de video de TikTok
-            patterns = [
-                r'"playAddr":"([^"]+)"',
-                r'"downloadAddr":"([^"]+)"',
-                r'"playapi":"([^"]+)"',
-                r'videoUrl":"([^"]+)"'
-            ]
-            
-            for i, pattern in enumerate(patterns):
-                matches = re.findall(pattern, page_source)
-                if matches:
-                    # Limpiar URLs (TikTok a veces las codifica)
-                    clean_urls = [url.replace('\\u002F', '/').replace('\\', '') for url in matches]
-                    download_urls[f'pattern_{i+1}'] = clean_urls
+            download_urls.update(find_download_urls(page_source))
             
             # También buscar en elementos video
             video_elements = self.driver.find_elements(By.TAG_NAME, "video")
@@ -292,7 +477,7 @@ class TikTokVideoScraper:
         """Extrae hashtags del video"""
         try:
             # Buscar hashtags en la descripción
-            description_elements = self.driver.find_elements(By.CSS_SELECTOR, '[data-e2e="browse-video-desc"] a, [data-e2e="video-desc"] a')
+            description_elements = self.driver.find_elements(By.CSS_SELECTOR, HASHTAG_SELECTOR)
             hashtags = []
             
             for element in description_elements:
@@ -366,22 +551,10 @@ class TikTokVideoScraper:
             except:
                 return count_str
     
-    def extract_video_id_from_url(self, url):
+    @staticmethod
+    def extract_video_id_from_url(url):
         """Extrae el ID del video de la URL"""
-        try:
-            # Para URLs como /video/1234567890
-            match = re.search(r'/video/(\d+)', url)
-            if match:
-                return match.group(1)
-            
-            # Para URLs cortas
-            parsed_url = urlparse(url)
-            if 'vm.tiktok.com' in parsed_url.netloc:
-                return parsed_url.path.strip('/')
-                
-        except:
-            pass
-        return None
+        return extract_video_id_from_url(url)
     
     def download_video(self, video_url, custom_filename=None, output_dir="downloads"):
         """Descarga el archivo de video"""
@@ -415,12 +588,15 @@ class TikTokVideoScraper:
     def save_data(self, video_data, filename=None):
         """Guarda los datos en un archivo JSON"""
         if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            video_id = video_data.get('metadata', {}).get('video_id', 'unknown')
-            filename = f"tiktok_data_{video_id}_{timestamp}.json"
+            video_id = self.video_key(video_data)
+            if video_id:
+                filename = os.path.basename(self.data_path(video_id))
+            else:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"tiktok_data_unknown_{timestamp}.json"
         
-        os.makedirs("data", exist_ok=True)
-        filepath = os.path.join("data", filename)
+        os.makedirs(DATA_FOLDER, exist_ok=True)
+        filepath = os.path.join(DATA_FOLDER, filename)
         
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(video_data, f, indent=2, ensure_ascii=False)
@@ -429,34 +605,88 @@ class TikTokVideoScraper:
         return filepath
     
     def close(self):
-        """Cierra el driver"""
-        self.driver.quit()
+        """Devuelve el driver al pool (y cierra el pool si es propio)"""
+        self.waiter.print_stats()
+        if self._lease is not None:
+            self.browser_pool.release(self._lease)
+            self._lease = None
+            self._driver = None
+        if self._owns_pool:
+            self.browser_pool.close()
 
-    def process_video(self, video_url, custom_filename=None):
-        """Procesa un video completo: extrae datos y descarga el video"""
+    @staticmethod
+    def data_path(video_id):
+        """Ruta del JSON de datos de un video"""
+        return os.path.join(DATA_FOLDER, f"tiktok_data_{video_id}.json")
+
+    @staticmethod
+    def video_path(video_id, output_dir=VIDEOS_FOLDER):
+        """Ruta del mp4 de un video"""
+        return os.path.join(output_dir, f"tiktok_video_{video_id}.mp4")
+
+    def video_key(self, video_data):
+        """ID de TikTok con el que se nombran todos los ficheros de un video (None si no se conoce)"""
+        return video_data.get('metadata', {}).get('video_id') or self.extract_video_id_from_url(video_data['url'])
+
+    def resolve_video_id(self, video_url):
+        """ID de un enlace corto siguiendo su redirección (sin descargar la página). None si falla"""
+        try:
+            response = self.session.head(video_url, allow_redirects=True, timeout=self.http_timeout)
+        except requests.RequestException as e:
+            print(f"Error resolviendo el enlace corto {video_url}: {str(e)}")
+            return None
+        video_id = self.extract_video_id_from_url(response.url)
+        return video_id if video_id and not is_short_link(response.url) else None
+
+    def scrape_video(self, video_url, skip_existing=True):
+        """
+        Extrae y guarda los datos del video. Devuelve (video_data, ID del video);
+        el ID es None si la página no lo da (los datos se guardan igualmente)
+        """
+        known_id = self.resolve_video_id(video_url) if is_short_link(video_url) else self.extract_video_id_from_url(video_url)
+        if skip_existing and known_id and os.path.exists(self.data_path(known_id)):
+            print(f"Datos ya guardados para el video {known_id}")
+            with open(self.data_path(known_id), 'r', encoding='utf-8') as f:
+                return json.load(f), known_id
+        
         video_data = self.extract_video_data(video_url)
-        if video_data:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            # Guardar datos con timestamp unificado
-            json_filename = f"tiktok_data_{timestamp}.json"
-            self.save_data(video_data, json_filename)
-            # Descargar video
-            try:
-                ydl_opts = {
-                    'outtmpl': f'downloads/tiktok_video_{timestamp}.%(ext)s',
-                    'format': 'best[ext=mp4]',
-                }
-                
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([video_data['url']])
-                    print("Video descargado con yt-dlp")
-                    video_downloaded = True
-                    
-            except ImportError:
-                print("yt-dlp no está instalado. Instala con: pip install yt-dlp")
-            except Exception as e:
-                print(f"Error con yt-dlp: {str(e)}")
+        if not video_data:
+            return None, None
+        video_id = self.video_key(video_data)
+        if not video_id:
+            print(f"No se pudo obtener el ID del video de {video_url}")
+        self.save_data(video_data)
+        return video_data, video_id
+
+    @staticmethod
+    def download_with_ytdlp(video_url, video_id, output_dir=VIDEOS_FOLDER, skip_existing=True):
+        """Descarga el video con yt-dlp. Devuelve True si la descarga termina bien"""
+        if skip_existing and os.path.exists(TikTokVideoScraper.video_path(video_id, output_dir)):
+            print(f"Video {video_id} ya descargado")
+            return True
+        try:
+            ydl_opts = {
+                'outtmpl': f'{output_dir}/tiktok_video_{video_id}.%(ext)s',
+                'format': 'best[ext=mp4]',
+            }
 
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                ydl.download([video_url])
+                print("Video descargado con yt-dlp")
+                return True
+
+        except ImportError:
+            print("yt-dlp no está instalado. Instala con: pip install yt-dlp")
+        except Exception as e:
+            print(f"Error con yt-dlp: {str(e)}")
+        return False
+
+    def process_video(self, video_url, custom_filename=None):
+        """Procesa un video completo: extrae datos y descarga el video"""
+        video_data, video_id = self.scrape_video(video_url)
+        if video_data and video_id:
+            return self.download_with_ytdlp(video_data['url'], video_id)
+        return False
 
 if __name__ == "__main__":
     scraper = TikTokVideoScraper(headless=False)  # Cambiar a True para modo headless
@@ -0,0 +1,42 @@
+import hashlib
+import re
+from urllib.parse import urlparse
+
+# IDs de video a partir de la URL, sin dependencias (lo usan también el state store y el pipeline)
+
+VIDEO_ID_PATTERN = re.compile(r'/video/(\d+)')
+
+# Dominios de los enlaces cortos, que redirigen a la URL completa del video
+SHORT_LINK_HOSTS = ("vm.tiktok.com", "vt.tiktok.com")
+
+
+def extract_video_id_from_url(url):
+    """Extrae el ID del video de la URL"""
+    try:
+        # Para URLs como /video/1234567890
+        match = VIDEO_ID_PATTERN.search(url)
+        if match:
+            return match.group(1)
+
+        # Para URLs cortas
+        parsed_url = urlparse(url)
+        if 'vm.tiktok.com' in parsed_url.netloc:
+            return parsed_url.path.strip('/')
+
+    except:
+        pass
+    return None
+
+
+def is_short_link(url):
+    """Enlaces cortos (vm.tiktok.com, tiktok.com/t/...) cuyo ID real solo se conoce tras la redirección"""
+    try:
+        parsed_url = urlparse(url)
+    except ValueError:
+        return False
+    return parsed_url.netloc in SHORT_LINK_HOSTS or parsed_url.path.startswith('/t/')
+
+
+def provisional_video_id(url):
+    """Clave para una URL sin ID reconocible, hasta que el scraping dé el ID real"""
+    return "url:" + hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,216 @@
+import queue
+import threading
+import time
+
+from tiktok_scraping.browser_pool import BrowserPool
+from tiktok_scraping.tiktok_video_scraper import TikTokVideoScraper
+
+# Marca de fin de cola
+_STOP = object()
+
+
+class IngestionStats:
+    """Acumula tiempos por URL y calcula el throughput agregado"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records = {}
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    def record(self, url, **fields):
+        with self._lock:
+            self.records.setdefault(url, {'url': url}).update(fields)
+
+    def get(self, url):
+        with self._lock:
+            return dict(self.records.get(url, {}))
+
+    def summary(self):
+        """Devuelve un resumen agregado de la ejecución"""
+        with self._lock:
+            records = list(self.records.values())
+
+        elapsed = (self.finished_at or time.perf_counter()) - (self.started_at or time.perf_counter())
+        ok = [r for r in records if r.get('status') == 'ok']
+        scrape_times = [r['scrape_seconds'] for r in records if 'scrape_seconds' in r]
+        download_times = [r['download_seconds'] for r in records if 'download_seconds' in r]
+
+        return {
+            'total': len(records),
+            'ok': len(ok),
+            'failed': len(records) - len(ok),
+            'elapsed_seconds': elapsed,
+            'videos_per_minute': len(ok) / elapsed * 60 if elapsed > 0 else 0.0,
+            'mean_scrape_seconds': sum(scrape_times) / len(scrape_times) if scrape_times else None,
+            'mean_download_seconds': sum(download_times) / len(download_times) if download_times else None,
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print("\n=== THROUGHPUT ===")
+        print(f"Videos procesados: {summary['ok']}/{summary['total']} ({summary['failed']} fallidos)")
+        print(f"Tiempo total: {summary['elapsed_seconds']:.1f} s")
+        print(f"Throughput: {summary['videos_per_minute']:.2f} videos/min")
+        if summary['mean_scrape_seconds'] is not None:
+            print(f"Scraping medio por URL: {summary['mean_scrape_seconds']:.2f} s")
+        if summary['mean_download_seconds'] is not None:
+            print(f"Descarga media por URL: {summary['mean_download_seconds']:.2f} s")
+
+
+class VideoIngestionPool:
+    """
+    Pool acotado para el paso download-videos.
+
+    Los workers de navegador extraen los datos de la página (con Chrome del
+    pool compartido cuando hace falta) y dejan el video en una cola acotada
+    que consumen los workers de descarga (yt-dlp), de forma que scraping y
+    descargas se solapan.
+    """
+
+    def __init__(self, browser_workers=2, download_workers=4, headless=True, queue_size=None, state_store=None,
+                 browser_pool=None):
+        if browser_workers < 1 or download_workers < 1:
+            raise ValueError("Se necesita al menos un worker de navegador y uno de descarga")
+        self.browser_workers = browser_workers
+        self.download_workers = download_workers
+        self.headless = headless
+        # La cola acotada aplica backpressure a los navegadores si las descargas van por detrás
+        self.download_queue = queue.Queue(maxsize=queue_size or download_workers * 2)
+        self.url_queue = queue.Queue()
+        self.stats = IngestionStats()
+        # Si hay state store, cada video scrapeado/descargado queda registrado
+        self.state_store = state_store
+        # Sin pool externo se crea uno con un Chrome por worker, que se cierra al terminar run()
+        self.browser_pool = browser_pool
+
+    def _mark_scraped(self, url, video_id):
+        if self.state_store is None:
+            return
+        # Los enlaces cortos están registrados con una clave provisional hasta conocer el ID
+        self.state_store.resolve(url, video_id)
+        self.state_store.mark(video_id, 'scraped', file_key=video_id)
+
+    def _mark_downloaded(self, video_id):
+        if self.state_store is not None:
+            self.state_store.mark(video_id, 'downloaded')
+
+    def _browser_worker(self, worker_id):
+        scraper = None
+        try:
+            scraper = TikTokVideoScraper(headless=self.headless, browser_pool=self.browser_pool)
+            while True:
+                url = self.url_queue.get()
+                if url is _STOP:
+                    break
+
+                print(f"[navegador {worker_id}] Procesando URL: {url}")
+                start = time.perf_counter()
+                try:
+                    video_data, video_id = scraper.scrape_video(url)
+                except Exception as e:
+                    print(f"[navegador {worker_id}] Error procesando {url}: {str(e)}")
+                    video_data, video_id = None, None
+                scrape_seconds = time.perf_counter() - start
+                self.stats.record(url, scrape_seconds=scrape_seconds)
+
+                if video_data and video_id:
+                    self._mark_scraped(url, video_id)
+                    self.download_queue.put((url, video_data['url'], video_id, video_id))
+                else:
+                    self.stats.record(url, status='scrape_failed')
+        except Exception as e:
+            # Si el navegador no arranca, el resto de workers se reparte sus URLs
+            print(f"[navegador {worker_id}] Error en el navegador: {str(e)}")
+        finally:
+            if scraper is not None:
+                scraper.close()
+
+    def _drain_pending_urls(self):
+        """Marca como fallidas las URLs que ningún navegador llegó a procesar"""
+        while True:
+            try:
+                url = self.url_queue.get_nowait()
+            except queue.Empty:
+                return
+            if url is not _STOP:
+                self.stats.record(url, status='scrape_failed')
+
+    def _download_worker(self, worker_id):
+        while True:
+            item = self.download_queue.get()
+            if item is _STOP:
+                break
+
+            # El ID del video es la clave del state store; file_key nombra los ficheros, y en los
+            # registros reconstruidos de ejecuciones anteriores puede ser distinta del ID
+            url, video_url, video_id, file_key = item
+            start = time.perf_counter()
+            ok = TikTokVideoScraper.download_with_ytdlp(video_url, file_key)
+            download_seconds = time.perf_counter() - start
+
+            record = self.stats.get(url)
+            total = record.get('scrape_seconds', 0.0) + download_seconds
+            self.stats.record(url, download_seconds=download_seconds, status='ok' if ok else 'download_failed')
+            if ok:
+                self._mark_downloaded(video_id)
+            print(f"[descarga {worker_id}] {url} -> {'ok' if ok else 'error'} "
+                  f"(scraping {record.get('scrape_seconds', 0.0):.1f} s, descarga {download_seconds:.1f} s, total {total:.1f} s)")
+
+    def run(self, urls, scraped=None):
+        """
+        Procesa todas las URLs y devuelve el resumen de throughput.
+        scraped: {url: (ID del video, clave de sus ficheros)} de videos ya scrapeados que
+        solo falta descargar.
+        """
+        scraped = scraped or {}
+        own_pool = self.browser_pool is None
+        if own_pool:
+            # Los navegadores arrancan al necesitarse (el camino rápido no usa Chrome) y se reutilizan
+            self.browser_pool = BrowserPool(size=self.browser_workers, headless=self.headless, warm=False)
+        try:
+            return self._run(urls, scraped)
+        finally:
+            if own_pool:
+                self.browser_pool.print_stats()
+                self.browser_pool.close()
+                self.browser_pool = None
+
+    def _run(self, urls, scraped):
+        urls = [url for url in dict.fromkeys(urls) if url not in scraped]
+        for url in urls:
+            self.url_queue.put(url)
+        for _ in range(self.browser_workers):
+            self.url_queue.put(_STOP)
+
+        self.stats.start()
+        browser_threads = [
+            threading.Thread(target=self._browser_worker, args=(i + 1,), daemon=True)
+            for i in range(self.browser_workers)
+        ]
+        download_threads = [
+            threading.Thread(target=self._download_worker, args=(i + 1,), daemon=True)
+            for i in range(self.download_workers)
+        ]
+        for thread in browser_threads + download_threads:
+            thread.start()
+        for url, (video_id, file_key) in scraped.items():
+            self.download_queue.put((url, url, video_id, file_key))
+
+        for thread in browser_threads:
+            thread.join()
+        self._drain_pending_urls()
+        for _ in range(self.download_workers):
+            self.download_queue.put(_STOP)
+        for thread in download_threads:
+            thread.join()
+        self.stats.finish()
+
+        self.stats.print_summary()
+        return self.stats.summary()